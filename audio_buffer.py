@@ -0,0 +1,165 @@
+import threading
+import time
+
+import numpy as np
+
+
+class SlidingWindow:
+    """Preallocated int16 sliding window over the most recent audio samples.
+
+    Every sample is stored twice, ``capacity`` samples apart, so the newest
+    ``capacity`` samples always form one contiguous slice. Writing a chunk
+    costs two small copies and reading the window costs nothing.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self._capacity: int = capacity
+        self._buffer: np.ndarray = np.zeros(2 * capacity, dtype=np.int16)
+        self._pos: int = 0  # Next write index in [0, capacity)
+        self._filled: int = 0
+
+    def __len__(self) -> int:
+        return self._filled
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def clear(self) -> None:
+        """Forget all samples (the storage is kept)."""
+        self._pos = 0
+        self._filled = 0
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append samples, dropping the oldest ones beyond capacity."""
+        n = len(samples)
+        if n == 0:
+            return
+        cap = self._capacity
+        if n >= cap:
+            self._buffer[:cap] = samples[-cap:]
+            self._buffer[cap:] = samples[-cap:]
+            self._pos = 0
+            self._filled = cap
+            return
+
+        first = min(n, cap - self._pos)
+        end = self._pos + first
+        self._buffer[self._pos : end] = samples[:first]
+        self._buffer[self._pos + cap : end + cap] = samples[:first]
+        rest = n - first
+        if rest:
+            self._buffer[:rest] = samples[first:]
+            self._buffer[cap : cap + rest] = samples[first:]
+        self._pos = (self._pos + n) % cap
+        self._filled = min(self._filled + n, cap)
+
+    def view(self) -> np.ndarray:
+        """Contiguous view of the window, oldest sample first.
+
+        The view aliases the internal storage and is only valid until the
+        next call to write().
+        """
+        end = self._pos + self._capacity
+        return self._buffer[end - self._filled : end]
+
+
+class SampleRing:
+    """Bounded single-producer, single-consumer ring of int16 samples.
+
+    The audio callback writes into preallocated storage and the detector
+    thread reads fixed-size chunks out of it. Each side only advances its
+    own counter, so the two never need a lock. A write that does not fit
+    is dropped as a whole and counted as an overrun, so memory stays at
+    ``capacity`` samples however far the consumer falls behind.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self._capacity: int = capacity
+        self._buffer: np.ndarray = np.zeros(capacity, dtype=np.int16)
+        # Total samples written and read, only the owning side changes each
+        self._write_count: int = 0
+        self._read_count: int = 0
+        self._overrun_count: int = 0
+        self._dropped_sample_count: int = 0
+        self._data_ready = threading.Event()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def overrun_count(self) -> int:
+        return self._overrun_count
+
+    @property
+    def dropped_sample_count(self) -> int:
+        return self._dropped_sample_count
+
+    def available(self) -> int:
+        """Number of samples waiting to be read."""
+        return self._write_count - self._read_count
+
+    def write(self, data) -> bool:
+        """Append int16 samples (any buffer), producer side only.
+
+        Returns:
+            False if the samples did not fit and were dropped.
+        """
+        samples = np.frombuffer(data, dtype=np.int16)
+        n = len(samples)
+        if n == 0:
+            return True
+        if n > self._capacity - (self._write_count - self._read_count):
+            self._overrun_count += 1
+            self._dropped_sample_count += n
+            return False
+
+        cap = self._capacity
+        pos = self._write_count % cap
+        first = min(n, cap - pos)
+        self._buffer[pos : pos + first] = samples[:first]
+        if first < n:
+            self._buffer[: n - first] = samples[first:]
+        self._write_count += n
+        self._data_ready.set()
+        return True
+
+    def read(self, out: np.ndarray, timeout: float | None = None) -> bool:
+        """Fill out with the oldest samples, consumer side only.
+
+        Waits up to timeout seconds until len(out) samples are available.
+
+        Returns:
+            False if not enough samples arrived in time, nothing is read then.
+        """
+        n = len(out)
+        if n > self._capacity:
+            raise ValueError("cannot read more than capacity samples at once")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.available() < n:
+            # Clear before checking again so a concurrent write is not missed
+            self._data_ready.clear()
+            if self.available() >= n:
+                break
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._data_ready.wait(remaining)
+
+        cap = self._capacity
+        pos = self._read_count % cap
+        first = min(n, cap - pos)
+        out[:first] = self._buffer[pos : pos + first]
+        if first < n:
+            out[first:] = self._buffer[: n - first]
+        self._read_count += n
+        return True
+
+    def discard(self) -> None:
+        """Drop all samples waiting to be read, consumer side only."""
+        self._read_count = self._write_count
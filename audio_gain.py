@@ -0,0 +1,92 @@
+import numpy as np
+
+from audio_level import level_dbfs
+
+
+class GainStage:
+    """In-place int16 gain with optional automatic gain control.
+
+    The gain is applied in Q12 fixed point through an int32 scratch buffer
+    and written back into the chunk, so processing allocates nothing once
+    the scratch buffers match the chunk size. With AGC enabled the gain
+    follows the level of loud chunks towards ``agc_target_dbfs``, falling
+    fast to avoid clipping and rising slowly. Quiet chunks below
+    ``agc_gate_dbfs`` leave the gain alone so silence is not amplified.
+    """
+
+    Q_BITS = 12
+
+    def __init__(
+        self,
+        gain: float = 1.0,
+        max_gain: float = 10.0,
+        agc_enabled: bool = False,
+        agc_target_dbfs: float = -20.0,
+        agc_gate_dbfs: float = -50.0,
+        attack: float = 0.5,
+        release: float = 0.05,
+        chunk_size: int = 1280,
+    ) -> None:
+        if gain < 0:
+            raise ValueError("gain must be non-negative")
+        # Keeps int16 * gain in Q12 inside int32
+        if max_gain > 16:
+            raise ValueError("max_gain must be <= 16")
+        self._max_gain: float = max_gain
+        self._gain: float = min(gain, max_gain)
+        self._agc_enabled: bool = agc_enabled
+        self._agc_target_dbfs: float = agc_target_dbfs
+        self._agc_gate_dbfs: float = agc_gate_dbfs
+        self._attack: float = attack
+        self._release: float = release
+        self._scratch: np.ndarray = np.empty(chunk_size, dtype=np.int32)
+        self._samples: np.ndarray = np.empty(chunk_size, dtype=np.float32)
+        self._clipped_chunk_count: int = 0
+
+    @property
+    def gain(self) -> float:
+        return self._gain
+
+    @property
+    def clipped_chunk_count(self) -> int:
+        return self._clipped_chunk_count
+
+    def _ensure_scratch(self, n: int) -> None:
+        if len(self._scratch) < n:
+            self._scratch = np.empty(n, dtype=np.int32)
+            self._samples = np.empty(n, dtype=np.float32)
+
+    def _adapt(self, audio: np.ndarray) -> None:
+        level = level_dbfs(audio, self._samples)
+        if level < self._agc_gate_dbfs:
+            return
+        target_gain = 10 ** ((self._agc_target_dbfs - level) / 20)
+        target_gain = min(max(target_gain, 1.0 / self._max_gain), self._max_gain)
+        rate = self._attack if target_gain < self._gain else self._release
+        self._gain += rate * (target_gain - self._gain)
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        """Apply the gain to a writable int16 chunk in place and return it."""
+        n = len(audio)
+        if n == 0:
+            return audio
+        self._ensure_scratch(n)
+        if self._agc_enabled:
+            self._adapt(audio)
+
+        gain_q = round(self._gain * (1 << self.Q_BITS))
+        if gain_q == 1 << self.Q_BITS:
+            return audio
+
+        scratch = self._scratch[:n]
+        np.copyto(scratch, audio)
+        np.multiply(scratch, gain_q, out=scratch)
+        # Round to nearest instead of towards minus infinity
+        np.add(scratch, 1 << (self.Q_BITS - 1), out=scratch)
+        np.right_shift(scratch, self.Q_BITS, out=scratch)
+        if scratch.max() > 32767 or scratch.min() < -32768:
+            self._clipped_chunk_count += 1
+            np.minimum(scratch, 32767, out=scratch)
+            np.maximum(scratch, -32768, out=scratch)
+        np.copyto(audio, scratch, casting="unsafe")
+        return audio
@@ -0,0 +1,22 @@
+import math
+
+import numpy as np
+
+
+def level_dbfs(audio: np.ndarray, scratch: np.ndarray) -> float:
+    """RMS level of int16 audio in dB relative to full scale.
+
+    Args:
+        scratch: float32 buffer at least as long as the audio, the samples
+            are cast into it so measuring allocates nothing.
+    """
+    if len(audio) == 0:
+        return -math.inf
+    # Cast into the scratch buffer first, a ufunc with dtype= would allocate
+    # a temporary cast buffer on every call
+    samples = scratch[: len(audio)]
+    np.copyto(samples, audio, casting="unsafe")
+    mean_square = float(np.dot(samples, samples)) / len(audio)
+    if mean_square <= 0:
+        return -math.inf
+    return 10 * math.log10(mean_square / (32768.0 * 32768.0))
@@ -0,0 +1,66 @@
+import time
+import tracemalloc
+
+import numpy as np
+
+from audio_buffer import SlidingWindow
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1280
+WINDOW_SIZE = 2 * SAMPLE_RATE
+CHUNK_COUNT = 5000
+
+
+class ConcatenateBuffer:
+    """The previous approach: concatenate and trim on every chunk."""
+
+    def __init__(self) -> None:
+        self._buffer = np.array([], dtype=np.int16)
+
+    def write(self, samples: np.ndarray) -> None:
+        self._buffer = np.concatenate([self._buffer, samples])
+        if len(self._buffer) > WINDOW_SIZE:
+            self._buffer = self._buffer[-WINDOW_SIZE:]
+
+    def view(self) -> np.ndarray:
+        return self._buffer
+
+
+def run(buffer, chunks: list[np.ndarray]) -> int:
+    checksum = 0
+    for chunk in chunks:
+        buffer.write(chunk)
+        checksum += int(buffer.view()[0])
+    return checksum
+
+
+def measure(name: str, buffer, chunks: list[np.ndarray]) -> int:
+    # Fill the window first so only the steady state is measured
+    run(buffer, chunks[: 2 * WINDOW_SIZE // CHUNK_SIZE])
+
+    start = time.perf_counter()
+    checksum = run(buffer, chunks)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run(buffer, chunks[:100])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{name:<16} | {1e6 * elapsed / len(chunks):8.2f} us/chunk | "
+        f"peak allocation {peak / 1024:8.1f} KiB"
+    )
+    return checksum
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    chunks = [
+        rng.integers(-32768, 32767, CHUNK_SIZE, dtype=np.int16)
+        for _ in range(CHUNK_COUNT)
+    ]
+    print(f"{CHUNK_COUNT} chunks of {CHUNK_SIZE} samples, {WINDOW_SIZE} sample window")
+    a = measure("concatenate", ConcatenateBuffer(), chunks)
+    b = measure("sliding window", SlidingWindow(WINDOW_SIZE), chunks)
+    assert a == b, "Both buffers must see the same window"
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sbb_fallblatt import sbb_rs485, scanner
+from sbb_fallblatt.async_rs485 import AsyncPanelControl
+from sbb_fallblatt.panel_mock import MockModule, MockPanel
+
+
+@contextmanager
+def served_panel(panel: MockPanel) -> Iterator[str]:
+    """Serve a MockPanel on its pty, yields the serial port name."""
+    thread = threading.Thread(target=panel.run, daemon=True, name="MockPanel")
+    thread.start()
+    try:
+        yield panel.get_serial_port()
+    finally:
+        panel.stop()
+        thread.join()
+
+
+def scan_slow_modules(reply_delay: float) -> None:
+    """Modules slower than the scan timeout must keep their own serials."""
+    panel = MockPanel(10, 12, reply_delay=reply_delay)
+    expected = {addr: panel.module(addr).serial for addr in (10, 11, 12)}
+    with served_panel(panel) as port:
+        found = scanner.scan_port(port, range(0, 30))
+    if found != expected:
+        raise AssertionError(
+            f"scan with {reply_delay}s reply delay: expected "
+            f"{sorted(expected)}, found "
+            f"{ {addr: serial.hex() for addr, serial in sorted(found.items())} }"
+        )
+
+
+def read_slow_modules(reply_delay: float) -> None:
+    """A late position must never be reported as another module's."""
+    positions = {10: 1, 11: 2}
+    panel = MockPanel(
+        modules=[MockModule(addr, position=pos) for addr, pos in positions.items()],
+        reply_delay=reply_delay,
+    )
+    with served_panel(panel) as port:
+        panel_control = sbb_rs485.PanelControl(port)
+        panel_control.connect()
+        try:
+            for retries in (0, 1, 2):
+                results = panel_control.read_positions([10, 11, 20], retries=retries)
+                for addr, (status, pos) in results.items():
+                    if status == panel_control.READ_OK and pos != positions.get(addr):
+                        raise AssertionError(
+                            f"read with {reply_delay}s reply delay and {retries} "
+                            f"retries: module {addr} read as {pos}"
+                        )
+            # The retries wait long enough for the slow modules
+            ok = {
+                addr: pos
+                for addr, (status, pos) in results.items()
+                if status == panel_control.READ_OK
+            }
+            if ok != positions:
+                raise AssertionError(
+                    f"read with {reply_delay}s reply delay: expected {positions}, "
+                    f"got {results}"
+                )
+        finally:
+            panel_control.serial.close()
+
+
+def share_async_bus() -> None:
+    """Coroutines sharing one AsyncPanelControl must never mix up frames."""
+    positions = {10: 1, 11: 2, 12: 3}
+    panel = MockPanel(
+        modules=[MockModule(addr, position=pos) for addr, pos in positions.items()]
+        + [MockModule(13)]
+    )
+
+    async def check_module(bus: AsyncPanelControl, addr: int) -> None:
+        for _ in range(5):
+            serial, pos = await asyncio.gather(
+                bus.get_serial_number(addr), bus.get_position(addr)
+            )
+            if serial != panel.module(addr).serial or pos != positions[addr]:
+                raise AssertionError(
+                    f"async bus: module {addr} read as {pos}, serial {serial.hex()}"
+                )
+
+    async def move_module(bus: AsyncPanelControl) -> None:
+        await bus.set_position(13, 7, priority=bus.PRIO_HIGH)
+        for _ in range(5):
+            results = await bus.read_positions(list(positions))
+            read = {addr: pos for addr, (_, pos) in results.items()}
+            if read != positions:
+                raise AssertionError(f"async bus: read {read}, expected {positions}")
+        # Seven steps take well under a second
+        await asyncio.sleep(1.5)
+        pos = await bus.get_position(13)
+        if pos != 7:
+            raise AssertionError(f"async bus: module 13 at {pos}, expected 7")
+
+    async def share(port: str) -> None:
+        panel_control = sbb_rs485.PanelControl(port)
+        async with AsyncPanelControl(panel_control) as bus:
+            await asyncio.gather(
+                move_module(bus), *(check_module(bus, addr) for addr in positions)
+            )
+        panel_control.serial.close()
+
+    with served_panel(panel) as port:
+        asyncio.run(share(port))
+    if panel.stats["bad_frames"] != 0 or panel.stats["unknown_addr"] != 0:
+        raise AssertionError(f"async bus: frames interleaved, {panel.stats}")
+
+
+def main() -> None:
+    start = time.perf_counter()
+    for reply_delay in (0.0, 0.05, 0.2):
+        scan_slow_modules(reply_delay)
+    for reply_delay in (0.0, 0.13):
+        read_slow_modules(reply_delay)
+    share_async_bus()
+    print(
+        f"[Bus Simulation] All scenarios passed in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,55 +3,144 @@ import signal
 import sys
 import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Any
 
 import rich.traceback
 from gpiozero import Button
+from gpiozero.pins import Factory
 
+from flip_timing import FlipTimer
+from metrics import MetricsRegistry, MetricsServer, thread_cpu_seconds
+from panel_actor import PanelClockActor
 from sbb_fallblatt import sbb_rs485
-from wake_word_detector import WakeWordDetector
+from scheduler import Scheduler, Timer
+from shutdown_sequence import ShutdownSequence
+from startup_timeline import StartupTimeline
+from streaming_model import StreamingWakeWordModel
+from wake_word_detector import (
+    AudioDeviceError,
+    WakeWordDetector,
+    load_wake_word_model,
+)
 
 rich.traceback.install(show_locals=True)
 
 
 class Clock:
     def __init__(
-        self, addr_hour: int, addr_min: int, enable_demo_mode: bool = False
+        self,
+        addr_hour: int,
+        addr_min: int,
+        enable_demo_mode: bool = False,
+        port: str = "/dev/ttyS0",
+        bus_profile: dict[str, Any] | None = None,
+        panel_clock: sbb_rs485.PanelClockControl | None = None,
+        pin_factory: Factory | None = None,
+        scheduler: Scheduler | None = None,
+        now_fn: Callable[[], datetime] = datetime.now,
+        power_off: Callable[[], None] | None = None,
+        enable_wake_word: bool = True,
+        metrics_port: int | None = None,
+        metrics_socket: str | None = None,
     ) -> None:
+        """Connect the panel and buttons and run the boot sequence.
+
+        The defaults drive the real hardware. Every back end can be replaced
+        to run the clock off the Pi, see clock_simulation.py.
+
+        Args:
+            port: Serial port of the panel, unused if panel_clock is given.
+            bus_profile: Bus timing measured by sbb_fallblatt.bus_profile.
+                Modules that take several frames after one break get the
+                hour and minute with a single break, without it every frame
+                waits for its own 50 ms break.
+            panel_clock: A connected panel to use instead of opening port,
+                e.g. one wired to a MockPanel.
+            pin_factory: gpiozero pin factory of the buttons, e.g. a
+                MockFactory off the Pi.
+            scheduler: Scheduler to run on, its time_fn and now_fn must
+                advance together.
+            now_fn: Wall clock time shown on the panel.
+            power_off: Called when the shutdown countdown ends instead of
+                shutting down the system.
+            enable_wake_word: Whether to load the model and listen.
+            metrics_port: Serve the metrics over HTTP on this port while
+                running.
+            metrics_socket: Serve the metrics over HTTP on this Unix socket
+                while running.
+        """
         self._addr_hour: int = addr_hour
         self._addr_min: int = addr_min
         self._enable_demo_mode: bool = enable_demo_mode
-
-        self._wake_word_button = Button(6, bounce_time=0.2)
-        self._shutdown_button = Button(26, bounce_time=0.2)
+        self._now = now_fn
+        self._enable_wake_word: bool = enable_wake_word
+        self._metrics_port: int | None = metrics_port
+        self._metrics_socket: str | None = metrics_socket
+        self._metrics_servers: list[MetricsServer] = []
+        self._metrics = MetricsRegistry()
+
+        self._startup = StartupTimeline()
+        self._model_future: Future[StreamingWakeWordModel] | None = None
+        if self._enable_wake_word:
+            # Loading the wake word model takes longest, do it while the panel
+            # boots
+            model_loader = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="ModelLoad"
+            )
+            self._model_future = model_loader.submit(self._load_wake_word_model)
+            model_loader.shutdown(wait=False)
+
+        self._wake_word_button = Button(6, bounce_time=0.2, pin_factory=pin_factory)
+        self._shutdown_button = Button(26, bounce_time=0.2, pin_factory=pin_factory)
 
         self._shutdown_timeout: int = 10  # Seconds
         self._wake_word_timeout: int = 5  # Minutes
 
-        self._wake_word_trigger_time: datetime | None = None
-        self._panel_clock = sbb_rs485.PanelClockControl(
-            port="/dev/ttyS0", addr_hour=self._addr_hour, addr_min=self._addr_min
+        self._scheduler = scheduler or Scheduler()
+        # Scheduler time of the last wake word detection
+        self._wake_word_trigger_time: float | None = None
+        self._tick_timer: Timer | None = None
+        self._wake_word_timeout_timer: Timer | None = None
+        with self._startup.phase("panel connect"):
+            if panel_clock is None:
+                panel_clock = sbb_rs485.PanelClockControl(
+                    port=port, addr_hour=self._addr_hour, addr_min=self._addr_min
+                )
+                panel_clock.connect()
+            if bus_profile is not None:
+                panel_clock.profile = sbb_rs485.BusProfile.from_dict(bus_profile)
+            self._panel_clock = panel_clock
+        self._flip_timer = FlipTimer(
+            bus_latency=2 * self._panel_clock.profile.break_time
+        )
+        # Only the actor thread talks to the bus from here on
+        self._panel = PanelClockActor(self._panel_clock)
+        self._panel.start()
+        self._shutdown_sequence = ShutdownSequence(
+            self._scheduler,
+            show_time=self._panel.set_time,
+            power_off=power_off or self._power_off,
+            timeout=self._shutdown_timeout,
         )
-        self._panel_clock.connect()
 
-        self._panel_clock.set_hour(6)
-        self._panel_clock.set_minute(30)
+        with self._startup.phase("panel boot"):
+            self._panel.set_time(6, 30)
+            self._panel.wait_idle()
 
-        self._panel_clock.set_hour(0)
-        self._panel_clock.set_minute(0)
+            self._panel.set_time(0, 0)
 
         if self._wake_word_button.is_pressed:
             print("[Init] Mode: Wake word")
-            self._panel_clock.set_hour(12)
-            self._panel_clock.set_minute(34)
+            self._panel.set_time(12, 34)
         elif self._shutdown_button.is_pressed:
             print("[Init] Mode: Shutdown")
-            self._panel_clock.set_hour(0)
-            self._panel_clock.set_minute(60 - self._shutdown_timeout)
+            self._panel.set_time(0, 60 - self._shutdown_timeout)
         else:
             print("[Init] Mode: On")
-            self._panel_clock.set_hour(0)
-            self._panel_clock.set_minute(0)
+            self._panel.set_time(0, 0)
 
         # Attach the callbacks to the button press events
         self._wake_word_button.when_pressed = self._wake_word_button_pressed_handler
@@ -63,50 +152,141 @@ class Clock:
         self._demo_minutes: int = 0
         self._demo_hours: int = 0
 
-        self._shutdown_event = threading.Event()
-        self._wake_word_event = threading.Event()
-        self._wakeup_event = threading.Event()
         self._wake_word_detector: WakeWordDetector | None = None
+        self._register_metrics()
+
+        clock_ready = self._startup.mark("clock ready")
+        print(f"[Init] Clock ready after {clock_ready:.2f}s")
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        return self._metrics
+
+    def _register_metrics(self) -> None:
+        m = self._metrics
+        self._flip_lateness = m.histogram(
+            "clock_minute_flip_lateness_seconds",
+            "Measured landing of the minute blade minus the minute edge",
+            buckets=tuple(edge / 1000 for edge in FlipTimer.BUCKET_EDGES_MS),
+        )
+        m.gauge(
+            "clock_bus_latency_seconds",
+            "Smoothed bus time of a panel update used for the flip lead",
+            fn=lambda: self._flip_timer.bus_latency,
+        )
+        m.gauge(
+            "clock_flip_correction_seconds",
+            "Lead added for the measured lateness of the minute blade",
+            fn=lambda: self._flip_timer.correction,
+        )
+        m.counter(
+            "panel_bus_frames_total",
+            "Frames written to the panel bus",
+            fn=lambda: self._panel_clock.frames_sent,
+        )
+        m.counter(
+            "panel_bus_read_timeouts_total",
+            "Module replies that did not arrive in time",
+            fn=lambda: self._panel_clock.read_timeouts,
+        )
+        m.counter(
+            "panel_updates_total",
+            "Times sent to the panel",
+            fn=lambda: self._panel.metrics()["sent"],
+        )
+        m.counter(
+            "panel_updates_coalesced_total",
+            "Times replaced by a newer one before they were sent",
+            fn=lambda: self._panel.metrics()["coalesced"],
+        )
+        m.gauge(
+            "panel_queue_depth",
+            "Times waiting for or being sent to the panel",
+            fn=lambda: self._panel.metrics()["queue_depth"],
+        )
+        for key, name, help_text in (
+            ("inferences", "wake_word_inferences_total", "Classifier runs"),
+            (
+                "stale_windows",
+                "wake_word_stale_windows_total",
+                "Audio windows replaced by a newer one before they were scored",
+            ),
+            (
+                "deadline_misses",
+                "wake_word_deadline_misses_total",
+                "Audio windows scored later than the inference deadline",
+            ),
+            (
+                "skipped_chunks",
+                "wake_word_skipped_chunks_total",
+                "Audio chunks not scored because the room was silent",
+            ),
+            ("overruns", "audio_overruns_total", "Capture buffers dropped"),
+            (
+                "dropped_samples",
+                "audio_dropped_samples_total",
+                "Samples lost to capture overruns",
+            ),
+            (
+                "clipped_chunks",
+                "audio_clipped_chunks_total",
+                "Audio chunks clipped by the gain",
+            ),
+        ):
+            m.counter(name, help_text, fn=lambda key=key: self._detector_stat(key))
+        m.counter(
+            "process_thread_cpu_seconds_total",
+            "CPU time used per thread",
+            label_names=("thread",),
+            fn=thread_cpu_seconds,
+        )
+
+    def _detector_stat(self, key: str) -> int | None:
+        detector = self._wake_word_detector
+        return detector.stats()[key] if detector else None
+
+    def _load_wake_word_model(self) -> StreamingWakeWordModel:
+        with self._startup.phase("wake word model"):
+            return load_wake_word_model(self._wake_word_config().model_paths())
+
+    def _wake_word_config(self) -> WakeWordDetector.Config:
+        config = WakeWordDetector.Config()
+        config.input_device_name = "PCM2902 Audio Codec Analog Mono"
+        config.audio_gain = 1.0
+        config.agc_enabled = True
+        config.detection_threshold = 0.3
+        # Every extra wake word only adds its small classifier head
+        config.models = [
+            WakeWordDetector.ModelConfig(
+                "resources/models/custom/hey_clock_small_v1.onnx"
+            ),
+            # WakeWordDetector.ModelConfig(
+            #     "resources/models/custom/tick_tock_v3.onnx", threshold=0.5
+            # ),
+        ]
+        return config
 
     def _wake_word_button_pressed_handler(self) -> None:
         print("[Wake Word Button Pressed Handler] Wake word mode is turned on!")
-        self._panel_clock.set_hour(12)
-        self._panel_clock.set_minute(34)
+        self._panel.set_time(12, 34)
         if self._wake_word_detector:
             self._wake_word_detector.resume()
+        self._scheduler.post(self._update_clock)
 
     def _wake_word_button_released_handler(self) -> None:
         print("[Wake Word Button Released Handler] Resetting demo clock!")
         self._demo_minutes = 0
         self._demo_hours = 0
         self._wake_word_trigger_time = None
-        self._wake_word_event.clear()
         if self._wake_word_detector:
             self._wake_word_detector.pause()
-        self._wakeup_event.set()
+        self._scheduler.post(self._update_clock)
 
     def _shutdown_button_pressed_handler(self) -> None:
-        self._panel_clock.set_hour(0)
-        self._panel_clock.set_minute(60 - self._shutdown_timeout)
-
-        time.sleep(3)
-
-        for i in range(self._shutdown_timeout, 0, -1):
-            print(f"[Shutdown Button Pressed Handler] Shutting down in {i} seconds...")
-            self._panel_clock.set_minute(60 - i)
-
-            time.sleep(1)
+        self._scheduler.post(self._shutdown_sequence.press)
 
-            if not self._shutdown_button.is_pressed:
-                print(
-                    "[Shutdown Button Pressed Handler] "
-                    "Button released, shutdown cancelled."
-                )
-                return
-
-        print("[Shutdown Button Pressed Handler] Button still pressed, shutting down!")
-        self._panel_clock.set_hour(0)
-        self._panel_clock.set_minute(0)
+    def _power_off(self) -> None:
+        self._panel.wait_idle(timeout=5.0)
 
         # You can allow a specific shutdown command to be executed without a password.
         # For example, add the following line to your sudoers file (using visudo):
@@ -121,118 +301,271 @@ class Clock:
         print("[Shutdown Button Released Handler] Resetting demo clock!")
         self._demo_minutes = 0
         self._demo_hours = 0
-        self._wakeup_event.set()
+        self._scheduler.post(self._shutdown_sequence.release)
+        self._scheduler.post(self._update_clock)
 
-    def _wake_word_task(self) -> None:
-        print("[Wake Word Task] Starting!")
+    def refresh(self) -> None:
+        """Show what the current mode asks for, safe to call from any thread."""
+        self._scheduler.post(self._update_clock)
 
-        def wake_word_handler() -> None:
-            if not self._wake_word_button.is_pressed:
-                print("[Wake Word Handler] Wake word mode is not active!")
-                return
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Wait until every panel update posted so far has been sent."""
+        return self._panel.wait_idle(timeout)
 
-            if self._wake_word_trigger_time is not None:
-                print("[Wake Word Handler] Wake word has already been triggered!")
-                return
+    def wake_word_detected(self) -> None:
+        """Called by the detector for every wake word, from any thread."""
+        if not self._wake_word_button.is_pressed:
+            print("[Wake Word Handler] Wake word mode is not active!")
+            return
 
-            print("[Wake Word Handler] Wake word callback triggered!")
-            self._wake_word_trigger_time = datetime.now()
-            self._wake_word_event.set()
+        if self._wake_word_trigger_time is not None:
+            print("[Wake Word Handler] Wake word has already been triggered!")
+            return
 
-        config = WakeWordDetector.Config()
-        config.input_device_name = "PCM2902 Audio Codec Analog Mono"
-        config.audio_gain = 1.0
-        config.detection_threshold = 0.3
+        wake_word = (
+            self._wake_word_detector.last_wake_word
+            if self._wake_word_detector
+            else None
+        )
+        print(f"[Wake Word Handler] Wake word callback triggered by {wake_word}!")
+        self._wake_word_trigger_time = self._scheduler.time()
+        self._scheduler.post(self._wake_word_triggered)
 
-        retry_interval = 5
-        while True:
-            try:
-                self._wake_word_detector = WakeWordDetector(config=config)
-                break
-            except ValueError as e:
-                print(f"[Wake Word Task] Audio device not available, retrying in {retry_interval}s: {e}")
-                time.sleep(retry_interval)
+    def _wake_word_task(self) -> None:
+        print("[Wake Word Task] Starting!")
+
+        config = self._wake_word_config()
+        model = self._model_future.result()
 
-        self._wake_word_detector.register_wake_word_callback(wake_word_handler)
+        # Only the audio device is looked up again, the model is reused
+        retry_interval = 5
+        with self._startup.phase("audio device"):
+            while True:
+                try:
+                    self._wake_word_detector = WakeWordDetector(
+                        config=config, model=model, metrics=self._metrics
+                    )
+                    break
+                except AudioDeviceError as e:
+                    print(
+                        "[Wake Word Task] Audio device not available, "
+                        f"retrying in {retry_interval}s: {e}"
+                    )
+                    time.sleep(retry_interval)
+
+        self._wake_word_detector.register_wake_word_callback(self.wake_word_detected)
         if not self._wake_word_button.is_pressed:
             self._wake_word_detector.pause()
+
+        self._startup.mark("wake word ready")
+        print("[Wake Word Task] Startup timing:")
+        print(self._startup.report())
         self._wake_word_detector.listen_for_wake_word()
         print("[Wake Word Task] Exiting!")
 
-    def _clock_task(self) -> None:
-        print("[Clock Task] Starting!")
+    def _wake_word_triggered(self) -> None:
+        self._scheduler.cancel(self._wake_word_timeout_timer)
+        self._wake_word_timeout_timer = self._scheduler.call_later(
+            60 * self._wake_word_timeout, self._update_clock
+        )
+        self._update_clock()
 
-        while not self._shutdown_event.is_set():
-            if self._shutdown_button.is_pressed:
-                time.sleep(1)
-                continue
+    def _show_time(self, minute_edge: datetime | None) -> None:
+        """Show the time and schedule the update for the next minute edge.
 
-            if self._wake_word_button.is_pressed:
-                if self._wake_word_trigger_time is None:
-                    time.sleep(1)
-                    continue
-                else:
-                    elapsed: timedelta = datetime.now() - self._wake_word_trigger_time
-                    if elapsed.total_seconds() > 60 * self._wake_word_timeout:
-                        self._wake_word_trigger_time = None
-                        self._panel_clock.set_hour(12)
-                        self._panel_clock.set_minute(34)
-                        continue
-            else:
-                self._wake_word_trigger_time = None
+        The update is sent early by the measured actuation latency, so the
+        minute blade lands on the edge instead of starting to move there.
+
+        The target always follows the wall clock, so the panel catches up
+        when the clock steps, at the end of daylight saving time or after an
+        NTP correction.
 
-            if self._enable_demo_mode:
-                self._demo_minutes += 1
-                self._demo_minutes %= 60
-                self._demo_hours += 1
-                self._demo_hours %= 24
-                print(
-                    f"[Clock Task] Setting time to {self._demo_hours:02d}:"
-                    f"{self._demo_minutes:02d}"
+        Args:
+            minute_edge: The minute edge a scheduled update is sent for, None
+                to show the current time. It only sizes the lead.
+        """
+        minute_pos = self._panel_clock.shadow.get(self._addr_min)
+        if minute_edge is None:
+            lead = self._flip_timer.lead()
+        else:
+            lead = self._flip_timer.lead(
+                self._flip_timer.steps(
+                    minute_pos, self._panel_clock.calc_min_pos(minute_edge.minute)
                 )
-                self._panel_clock.set_hour(self._demo_hours)
-                self._panel_clock.set_minute(self._demo_minutes)
-                time.sleep(3)
+            )
+        target = (self._now() + timedelta(seconds=lead)).replace(
+            second=0, microsecond=0
+        )
+        if minute_edge is not None and abs(target - minute_edge) <= timedelta(
+            minutes=1
+        ):
+            # The timer fired a little early or the wall clock moved a bit,
+            # only a bigger step is worth jumping the panel for
+            target = minute_edge
+        target_pos = self._panel_clock.calc_min_pos(target.minute)
+
+        def flipped(bus_time: float) -> None:
+            # Runs on the actor thread, the landing is checked on the
+            # scheduler thread
+            self._flip_timer.record_bus_time(bus_time)
+            landing = self._flip_timer.mechanical_time(minute_pos, target_pos)
+            self._scheduler.call_later(
+                max(landing - FlipTimer.POLL_EARLY, 0),
+                self._check_landing,
+                target,
+                target_pos,
+                self._scheduler.time() + landing + FlipTimer.POLL_LATE,
+                None,
+            )
+
+        # Only a flip on the minute edge has a lateness to measure
+        on_edge = target == minute_edge and minute_pos != target_pos
+        self._panel.set_time(
+            target.hour, target.minute, on_sent=flipped if on_edge else None
+        )
+
+        next_edge = target + timedelta(minutes=1)
+        next_steps = self._flip_timer.steps(
+            target_pos, self._panel_clock.calc_min_pos(next_edge.minute)
+        )
+        delay = (next_edge - self._now()).total_seconds()
+        delay -= self._flip_timer.lead(next_steps)
+        self._tick_timer = self._scheduler.call_later(
+            max(delay, 0), self._update_clock, next_edge
+        )
+
+    def _check_landing(
+        self,
+        minute_edge: datetime,
+        target_pos: int,
+        deadline: float,
+        previous: datetime | None,
+    ) -> None:
+        """Read the minute module until it shows the target and record when.
+
+        Args:
+            previous: When the module was last read off the target, None
+                before the first read.
+        """
+
+        def on_read(pos: int | None) -> None:
+            now = self._now()
+            if pos != target_pos:
+                if self._scheduler.time() >= deadline:
+                    print(
+                        f"[Clock Task] Minute blade not at {minute_edge:%H:%M} "
+                        f"after the flip"
+                    )
+                    return
+                self._scheduler.call_later(
+                    FlipTimer.POLL_INTERVAL,
+                    self._check_landing,
+                    minute_edge,
+                    target_pos,
+                    deadline,
+                    now,
+                )
+                return
+
+            if previous is None:
+                # Already there on the first read, only the bound is known
+                landed, resolution = now, FlipTimer.POLL_EARLY
             else:
-                self._panel_clock.set_time_now()
-                ts: datetime = datetime.now()
-                sleeptime: float = 60 - (ts.second + ts.microsecond / 1000000.0)
-                # Wait until next minute, but wake early on shutdown or wake word trigger
-                end = time.monotonic() + sleeptime
-                while time.monotonic() < end:
-                    remaining = end - time.monotonic()
-                    if self._shutdown_event.wait(min(remaining, 0.2)):
-                        break
-                    if self._wake_word_event.is_set():
-                        self._wake_word_event.clear()
-                        break
-                    if self._wakeup_event.is_set():
-                        self._wakeup_event.clear()
-                        break
+                landed = previous + (now - previous) / 2
+                resolution = (now - previous).total_seconds()
+            lateness = (landed - minute_edge).total_seconds()
+            self._flip_timer.record_landing(lateness, resolution)
+            self._flip_lateness.observe(lateness)
+            print(f"[Clock Task] Minute flip lateness {1000 * lateness:+.0f} ms")
+            if minute_edge.minute == 0:
+                print("[Clock Task] Minute flip lateness:")
+                print(self._flip_timer.format_histogram())
+
+        self._panel.read_position(self._addr_min, on_read)
+
+    def _update_clock(self, minute_edge: datetime | None = None) -> None:
+        """Show what the current mode asks for and schedule the next update."""
+        self._scheduler.cancel(self._tick_timer)
+        self._tick_timer = None
+
+        if self._shutdown_button.is_pressed:
+            return
+
+        if self._wake_word_button.is_pressed:
+            if self._wake_word_trigger_time is None:
+                return
+            elapsed = self._scheduler.time() - self._wake_word_trigger_time
+            if elapsed >= 60 * self._wake_word_timeout:
+                self._wake_word_trigger_time = None
+                self._panel.set_time(12, 34)
+                return
+        else:
+            self._wake_word_trigger_time = None
+            self._scheduler.cancel(self._wake_word_timeout_timer)
+            self._wake_word_timeout_timer = None
+
+        if self._enable_demo_mode:
+            self._demo_minutes += 1
+            self._demo_minutes %= 60
+            self._demo_hours += 1
+            self._demo_hours %= 24
+            print(
+                f"[Clock Task] Setting time to {self._demo_hours:02d}:"
+                f"{self._demo_minutes:02d}"
+            )
+            self._panel.set_time(self._demo_hours, self._demo_minutes)
+            self._tick_timer = self._scheduler.call_later(3, self._update_clock)
+        else:
+            self._show_time(minute_edge)
 
+    def _clock_task(self) -> None:
+        print("[Clock Task] Starting!")
+        self.refresh()
+        self._scheduler.run()
         print("[Clock Task] Exiting!")
 
-    def _cleanup(self) -> None:
+    def close(self) -> None:
         """Clean up resources on shutdown."""
         print("[Clock] Shutting down...")
 
         # Signal threads to stop
-        self._shutdown_event.set()
+        self._scheduler.stop()
+        self._panel.stop()
 
         # Stop wake word detector
         if self._wake_word_detector:
             self._wake_word_detector.stop()
 
+        for server in self._metrics_servers:
+            server.stop()
+        self._metrics_servers.clear()
+
         # Release GPIO pins so they are not busy on next startup
         self._wake_word_button.close()
         self._shutdown_button.close()
 
         print("[Clock] Shutdown complete")
 
+    def _start_metrics_servers(self) -> None:
+        addresses = []
+        if self._metrics_port is not None:
+            addresses.append({"port": self._metrics_port})
+        if self._metrics_socket is not None:
+            addresses.append({"unix_socket": self._metrics_socket})
+        for address in addresses:
+            # The clock keeps running without metrics
+            try:
+                server = MetricsServer(self._metrics, **address)
+            except OSError as e:
+                print(f"[Clock] Cannot serve metrics on {address}: {e}")
+                continue
+            server.start()
+            self._metrics_servers.append(server)
+
     def _signal_handler(self, signum, _frame) -> None:
         """Handle shutdown signals (SIGINT, SIGTERM)."""
         print(f"\n[Clock] Received signal {signum}")
-        self._cleanup()
+        self.close()
         sys.exit(0)
 
     def run(self) -> None:
@@ -244,26 +577,32 @@ class Clock:
         clock_thread = threading.Thread(
             target=self._clock_task, daemon=False, name="ClockTask"
         )
-        wake_word_thread = threading.Thread(
-            target=self._wake_word_task, daemon=False, name="WakeWordTask"
-        )
+        threads = [clock_thread]
+        if self._enable_wake_word:
+            threads.append(
+                threading.Thread(
+                    target=self._wake_word_task, daemon=False, name="WakeWordTask"
+                )
+            )
+
+        for thread in threads:
+            thread.start()
 
-        clock_thread.start()
-        wake_word_thread.start()
+        self._start_metrics_servers()
 
         print("[Clock] All threads started. Press Ctrl+C to exit.")
 
         try:
             # Keep main thread alive and responsive to signals
-            while clock_thread.is_alive() or wake_word_thread.is_alive():
-                clock_thread.join(timeout=1.0)
-                wake_word_thread.join(timeout=1.0)
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1.0)
         except KeyboardInterrupt:
             print("\n[Clock] KeyboardInterrupt received")
-            self._cleanup()
+            self.close()
 
         # Wait for threads to finish
-        clock_thread.join(timeout=5.0)
-        wake_word_thread.join(timeout=5.0)
+        for thread in threads:
+            thread.join(timeout=5.0)
 
         print("[Clock] Exited")
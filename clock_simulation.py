@@ -0,0 +1,280 @@
+import time
+from datetime import datetime, timedelta
+
+from gpiozero.pins.mock import MockFactory
+
+from clock import Clock
+from sbb_fallblatt import sbb_rs485
+from sbb_fallblatt.motion import MotionModel
+from sbb_fallblatt.panel_mock import MockModule, MockPanel
+from scheduler import Scheduler
+
+ADDR_HOUR = 27
+ADDR_MIN = 1
+PIN_WAKE_WORD = 6
+PIN_SHUTDOWN = 26
+# Seconds for a full turn of the minute module
+FULL_TURN = 8.0
+
+
+class VirtualClock:
+    """Monotonic and wall clock time that only move when told to."""
+
+    def __init__(self, start: datetime) -> None:
+        self._start = start
+        self._time: float = 0.0
+        self._wall_offset = timedelta()
+
+    def monotonic(self) -> float:
+        return self._time
+
+    def now(self) -> datetime:
+        return self._start + self._wall_offset + timedelta(seconds=self._time)
+
+    def set(self, monotonic: float) -> None:
+        if monotonic < self._time:
+            raise ValueError("virtual time cannot go backwards")
+        self._time = monotonic
+
+    def step_wall_clock(self, seconds: float) -> None:
+        """Step the wall clock only, like a DST change or an NTP step."""
+        self._wall_offset += timedelta(seconds=seconds)
+
+
+class ClockSimulation:
+    """Run a Clock in virtual time against a MockPanel and mock GPIO pins.
+
+    Time only advances from one scheduler deadline to the next, and every
+    panel update is on the mock modules before time moves on, so runs are
+    deterministic and a simulated day takes a fraction of a second.
+    """
+
+    def __init__(
+        self,
+        start: datetime,
+        enable_demo_mode: bool = False,
+        minute_module: MockModule | None = None,
+    ) -> None:
+        self.time = VirtualClock(start)
+        self.mock_panel = MockPanel(
+            modules=[
+                MockModule(ADDR_HOUR, blade_count=24),
+                minute_module
+                or MockModule(ADDR_MIN, blade_count=MotionModel.BLADES_MINUTE),
+            ],
+            time_fn=self.time.monotonic,
+        )
+        panel_clock = sbb_rs485.PanelClockControl(
+            addr_hour=ADDR_HOUR, addr_min=ADDR_MIN
+        )
+        panel_clock.serial = self.mock_panel.open_serial()
+
+        self.pin_factory = MockFactory()
+        self.scheduler = Scheduler(time_fn=self.time.monotonic)
+        self.power_off_times: list[datetime] = []
+        self.clock = Clock(
+            addr_hour=ADDR_HOUR,
+            addr_min=ADDR_MIN,
+            enable_demo_mode=enable_demo_mode,
+            # Hour and minute after a single break, like a measured profile
+            bus_profile=sbb_rs485.BusProfile(
+                break_time=0, break_per_frame=False
+            ).to_dict(),
+            panel_clock=panel_clock,
+            pin_factory=self.pin_factory,
+            scheduler=self.scheduler,
+            now_fn=self.time.now,
+            power_off=lambda: self.power_off_times.append(self.time.now()),
+            enable_wake_word=False,
+        )
+        self.clock.refresh()
+        self._settle()
+
+    def close(self) -> None:
+        self.clock.close()
+        self.pin_factory.reset()
+
+    def _settle(self) -> None:
+        self.scheduler.run_pending()
+        self.clock.wait_idle()
+
+    def run_for(self, seconds: float) -> None:
+        """Advance virtual time, running every timer that falls due."""
+        end = self.time.monotonic() + seconds
+        while True:
+            deadline = self.scheduler.next_deadline()
+            if deadline is None or deadline > end:
+                break
+            self.time.set(max(deadline, self.time.monotonic()))
+            self._settle()
+        self.time.set(end)
+        self._settle()
+
+    def run_until(self, when: datetime) -> None:
+        self.run_for((when - self.time.now()).total_seconds())
+
+    def _set_button(self, pin: int, pressed: bool) -> None:
+        # The buttons pull up, pressed reads low
+        if pressed:
+            self.pin_factory.pin(pin).drive_low()
+        else:
+            self.pin_factory.pin(pin).drive_high()
+        self._settle()
+
+    def set_wake_word_mode(self, on: bool) -> None:
+        self._set_button(PIN_WAKE_WORD, on)
+
+    def set_shutdown(self, on: bool) -> None:
+        self._set_button(PIN_SHUTDOWN, on)
+
+    def say_wake_word(self) -> None:
+        self.clock.wake_word_detected()
+        self._settle()
+
+    def shown(self) -> tuple[int, int]:
+        """(hour, minute) showing on the mock modules right now."""
+        now = self.time.monotonic()
+        hour = self.mock_panel.module(ADDR_HOUR).position(now)
+        minute_pos = self.mock_panel.module(ADDR_MIN).position(now)
+        return hour, self.clock._panel_clock.calc_min_pos_rev(minute_pos)
+
+
+def expect(sim: ClockSimulation, hour: int, minute: int, what: str) -> None:
+    shown = sim.shown()
+    if shown != (hour, minute):
+        raise AssertionError(
+            f"{sim.time.now():%H:%M:%S.%f} {what}: expected "
+            f"{hour:02d}:{minute:02d}, showing {shown[0]:02d}:{shown[1]:02d}"
+        )
+
+
+def simulate_day(sim: ClockSimulation) -> int:
+    """Check every minute flip of one day, returns the number of flips."""
+    start = sim.time.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+    for i in range(24 * 60):
+        edge = start + timedelta(minutes=i)
+        # The minute blade must land on the edge, not start moving there
+        sim.run_until(edge + timedelta(milliseconds=10))
+        expect(sim, edge.hour, edge.minute, "minute flip")
+    return 24 * 60
+
+
+def simulate_slow_minute_module() -> None:
+    """A minute module slower than the motion model must still land on time."""
+    sim = ClockSimulation(
+        datetime(2026, 3, 29, 5, 59, 30),
+        minute_module=MockModule(
+            ADDR_MIN, blade_count=MotionModel.BLADES_MINUTE, start_time=0.45
+        ),
+    )
+    try:
+        start = sim.time.now().replace(second=0, microsecond=0)
+        # The first flips land late, the read back lateness corrects the lead
+        sim.run_until(start + timedelta(minutes=30))
+        for i in range(31, 40):
+            edge = start + timedelta(minutes=i)
+            sim.run_until(edge + timedelta(milliseconds=60))
+            expect(sim, edge.hour, edge.minute, "slow minute module flip")
+    finally:
+        sim.close()
+
+
+def simulate_wall_clock_steps(sim: ClockSimulation) -> None:
+    """The panel must follow the wall clock when it steps."""
+    # End of daylight saving time, start of it and an NTP step back
+    for step in (-3600, 3600, -150):
+        now = sim.time.now()
+        sim.run_until(now.replace(second=20, microsecond=0) + timedelta(minutes=1))
+        sim.time.step_wall_clock(step)
+        # The update scheduled before the step shows the stepped time
+        sim.run_for(60)
+        start = sim.time.now().replace(second=0, microsecond=0)
+        for i in range(1, 4):
+            edge = start + timedelta(minutes=i)
+            sim.run_until(edge + timedelta(milliseconds=10))
+            expect(sim, edge.hour, edge.minute, f"{step:+d}s wall clock step")
+
+
+def expect_time(sim: ClockSimulation, what: str) -> None:
+    now = sim.time.now()
+    expect(sim, now.hour, now.minute, what)
+
+
+def simulate_wake_word(sim: ClockSimulation) -> None:
+    # Give the blades time to turn after every mode change
+    sim.set_wake_word_mode(True)
+    sim.run_for(FULL_TURN)
+    expect(sim, 12, 34, "wake word mode")
+    sim.run_for(120)
+    expect(sim, 12, 34, "wake word mode without a wake word")
+
+    sim.say_wake_word()
+    sim.run_for(FULL_TURN)
+    expect_time(sim, "after the wake word")
+    sim.run_for(4 * 60)
+    expect_time(sim, "before the wake word timeout")
+    sim.run_for(60)
+    expect(sim, 12, 34, "after the wake word timeout")
+
+    sim.set_wake_word_mode(False)
+    sim.run_for(FULL_TURN)
+    expect_time(sim, "wake word mode off")
+
+
+def simulate_shutdown(sim: ClockSimulation) -> None:
+    sim.set_shutdown(True)
+    # The countdown shows 0:50 for 3 s, then one minute per second
+    sim.run_for(10.5)
+    expect(sim, 0, 57, "shutdown countdown")
+    sim.set_shutdown(False)
+    sim.run_for(FULL_TURN)
+    if sim.power_off_times:
+        raise AssertionError("cancelled shutdown powered off")
+    expect_time(sim, "shutdown cancelled")
+
+    sim.set_shutdown(True)
+    sim.run_for(12.5)
+    expect(sim, 0, 59, "end of the shutdown countdown")
+    sim.run_for(FULL_TURN)
+    expect(sim, 0, 0, "shutdown")
+    if len(sim.power_off_times) != 1:
+        raise AssertionError("shutdown did not power off exactly once")
+
+    # The simulated power off returns like a failed shutdown, the switch
+    # must still work
+    sim.set_shutdown(False)
+    sim.run_for(FULL_TURN)
+    expect_time(sim, "after a failed shutdown")
+    sim.set_shutdown(True)
+    sim.run_for(12.5 + FULL_TURN)
+    expect(sim, 0, 0, "shutdown retried")
+    if len(sim.power_off_times) != 2:
+        raise AssertionError("retried shutdown did not power off again")
+
+
+def main() -> None:
+    start = time.perf_counter()
+    sim = ClockSimulation(datetime(2026, 3, 29, 5, 59, 30))
+    try:
+        flips = simulate_day(sim)
+        day_time = time.perf_counter() - start
+        simulate_wall_clock_steps(sim)
+        simulate_wake_word(sim)
+        simulate_shutdown(sim)
+        total_time = time.perf_counter() - start
+    finally:
+        # Closing the gpiozero buttons takes a while, it is not measured
+        sim.close()
+
+    print(f"[Simulation] {flips} minute flips in {day_time:.3f}s")
+    print(f"[Simulation] Bus: {sim.mock_panel.stats}")
+
+    # A second clock can only claim the GPIO pins once the first is closed
+    slow_start = time.perf_counter()
+    simulate_slow_minute_module()
+    total_time += time.perf_counter() - slow_start
+    print(f"[Simulation] All scenarios passed in {total_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import bisect
+
+from sbb_fallblatt.motion import MotionModel
+
+
+class FlipTimer:
+    """Decide how early to send a minute update so the blade lands on :00.
+
+    The lead time is the measured bus latency (break + write), averaged
+    over recent updates, plus the mechanical flip time predicted by the
+    motion model of the minute module. The minute module is read back after
+    every flip, its lateness (measured landing time minus the minute edge)
+    goes into a histogram and corrects the lead, so a module slower or
+    faster than the model still lands on the edge.
+    """
+
+    # Upper bucket edges of the lateness histogram in milliseconds
+    BUCKET_EDGES_MS: tuple[int, ...] = (
+        -500, -200, -100, -50, -20, -10, 0, 10, 20, 50, 100, 200, 500
+    )
+
+    # Reading the minute module back starts this long before the predicted
+    # landing, repeats every POLL_INTERVAL and gives up POLL_LATE after it
+    POLL_EARLY: float = 0.5
+    POLL_INTERVAL: float = 0.05
+    POLL_LATE: float = 2.0
+    # The correction never moves the lead by more than this
+    MAX_CORRECTION: float = 1.0
+
+    def __init__(
+        self,
+        motion: MotionModel | None = None,
+        bus_latency: float = 0.1,
+        smoothing: float = 0.2,
+    ) -> None:
+        self._motion = motion or MotionModel(MotionModel.BLADES_MINUTE)
+        self._bus_latency: float = bus_latency
+        self._smoothing: float = smoothing
+        self._counts: list[int] = [0] * (len(self.BUCKET_EDGES_MS) + 1)
+        self._correction: float = 0.0
+        self._last_lateness: float | None = None
+
+    @property
+    def bus_latency(self) -> float:
+        return self._bus_latency
+
+    @property
+    def correction(self) -> float:
+        return self._correction
+
+    @property
+    def last_lateness(self) -> float | None:
+        return self._last_lateness
+
+    def mechanical_time(self, current_pos: int | None, target_pos: int) -> float:
+        return self._motion.settle_time(current_pos, target_pos)
+
+    def steps(self, current_pos: int | None, target_pos: int) -> int:
+        return self._motion.steps(current_pos, target_pos)
+
+    def lead(self, steps: int = 1) -> float:
+        """Seconds before the minute edge at which to send the update.
+
+        Most minutes the blade moves a single step, the minute module has an
+        extra blade between :59 and :00.
+        """
+        return self._bus_latency + self.mechanical_time(0, steps) + self._correction
+
+    def record_bus_time(self, bus_time: float) -> None:
+        """Record the seconds a minute update spent on the bus."""
+        self._bus_latency += self._smoothing * (bus_time - self._bus_latency)
+
+    def record_landing(self, lateness: float, resolution: float = 0.0) -> None:
+        """Record when the minute blade was read back on its target.
+
+        Args:
+            lateness: Measured landing time minus the minute edge.
+            resolution: How far off the measurement may be, the lead is only
+                corrected for a lateness beyond it.
+        """
+        self._last_lateness = lateness
+        bucket = bisect.bisect_left(self.BUCKET_EDGES_MS, lateness * 1000)
+        self._counts[bucket] += 1
+        if abs(lateness) > resolution:
+            self._correction += self._smoothing * lateness
+            self._correction = max(
+                -self.MAX_CORRECTION, min(self._correction, self.MAX_CORRECTION)
+            )
+
+    def histogram(self) -> list[tuple[str, int]]:
+        """(bucket label, count) pairs, from early to late."""
+        edges = self.BUCKET_EDGES_MS
+        labels = [f"<= {edges[0]} ms"]
+        labels += [f"{lo} .. {hi} ms" for lo, hi in zip(edges, edges[1:])]
+        labels += [f"> {edges[-1]} ms"]
+        return list(zip(labels, self._counts))
+
+    def format_histogram(self) -> str:
+        total = sum(self._counts) or 1
+        lines = []
+        for label, count in self.histogram():
+            bar = "#" * round(40 * count / total)
+            lines.append(f"{label:>16} | {count:5d} {bar}")
+        return "\n".join(lines)
@@ -0,0 +1,190 @@
+import threading
+import time
+from collections.abc import Callable
+
+import numpy as np
+
+from metrics import Histogram
+from streaming_model import StreamingWakeWordModel
+
+# Called on the worker thread with the scores of a window, returns whether
+# the stream restarts, e.g. after a detection
+ScoresHandler = Callable[[dict[str, float]], bool]
+
+
+class InferenceWorker:
+    """Score the latest audio window on a dedicated thread.
+
+    The audio thread submits a snapshot of the sliding window after every
+    chunk and never waits for the model. Only the latest window matters, so
+    a window that is still waiting when a newer one arrives is dropped
+    instead of queued and counted as stale. The worker keeps the streaming
+    model in step with the audio: it only feeds the samples that are new
+    since the last window it scored, and rebuilds the features from the
+    whole window when the stream had a gap.
+
+    Every window is tagged with the epoch of its stream. The audio thread
+    starts a new epoch after a gap (an overrun, a pause or a reset), and
+    the worker rebuilds the features on the first window of an epoch.
+    """
+
+    # Seconds between two reports of deadline misses
+    REPORT_INTERVAL = 10.0
+
+    def __init__(
+        self,
+        model: StreamingWakeWordModel,
+        model_names: list[str],
+        window_capacity: int,
+        on_scores: ScoresHandler,
+        deadline: float,
+        inference_seconds: Histogram | None = None,
+        detection_latency_seconds: Histogram | None = None,
+    ) -> None:
+        """
+        Args:
+            deadline: Seconds from submitting a window to its scores, longer
+                is counted as a deadline miss.
+            inference_seconds: Records the model time of every window.
+            detection_latency_seconds: Records the time from submitting a
+                window to its scores.
+        """
+        self._model = model
+        self._model_names = model_names
+        self._on_scores = on_scores
+        self._deadline: float = deadline
+        self._inference_seconds = inference_seconds
+        self._detection_latency_seconds = detection_latency_seconds
+
+        self._condition = threading.Condition()
+        # Two window buffers, swapped when the worker takes the pending one
+        self._pending_window: np.ndarray = np.empty(window_capacity, dtype=np.int16)
+        self._window: np.ndarray = np.empty(window_capacity, dtype=np.int16)
+        # (window length, stream position, epoch, submit time) of the pending
+        # window, None if there is none
+        self._pending: tuple[int, int, int, float] | None = None
+        self._stopped: bool = False
+        # Windows of older epochs belong to a stream that was restarted
+        self._min_epoch: int = 0
+        self._epoch: int | None = None
+        self._position: int = 0
+
+        self._inference_count: int = 0
+        self._stale_window_count: int = 0
+        self._prime_count: int = 0
+        self._deadline_miss_count: int = 0
+        self._reported_miss_count: int = 0
+        self._last_report: float = 0.0
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="WakeWordInference"
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        with self._condition:
+            self._stopped = True
+            self._pending = None
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def submit(self, window: np.ndarray, position: int, epoch: int) -> None:
+        """Score this window as soon as the worker is free.
+
+        Args:
+            window: The newest samples, oldest first, copied before returning.
+            position: Samples of the stream up to the end of the window.
+            epoch: Stream the window belongs to.
+        """
+        n = len(window)
+        with self._condition:
+            if self._pending is not None:
+                self._stale_window_count += 1
+            self._pending_window[:n] = window
+            self._pending = (n, position, epoch, time.monotonic())
+            self._condition.notify_all()
+
+    def clear(self) -> None:
+        """Drop the pending window, e.g. when detection is paused."""
+        with self._condition:
+            self._pending = None
+
+    def stats(self) -> dict[str, int]:
+        with self._condition:
+            return {
+                "inferences": self._inference_count,
+                "stale_windows": self._stale_window_count,
+                "primes": self._prime_count,
+                "deadline_misses": self._deadline_miss_count,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._pending is not None or self._stopped
+                )
+                if self._stopped:
+                    return
+                n, position, epoch, submitted = self._pending
+                self._pending = None
+                self._window, self._pending_window = self._pending_window, self._window
+                if epoch < self._min_epoch:
+                    continue
+
+            try:
+                self._score(self._window[:n], position, epoch, submitted)
+            except Exception as e:
+                print(f"[Inference Worker] Scoring failed: {e}")
+                self._epoch = None
+
+    def _report_misses(self, now: float, latency: float) -> None:
+        # Under CPU pressure every window can miss, report them in batches
+        if now - self._last_report < self.REPORT_INTERVAL:
+            return
+        with self._condition:
+            misses = self._deadline_miss_count - self._reported_miss_count
+            self._reported_miss_count = self._deadline_miss_count
+        self._last_report = now
+        print(
+            f"[Inference Worker] {misses} windows missed the "
+            f"{1000 * self._deadline:.0f} ms deadline, the last one took "
+            f"{1000 * latency:.0f} ms"
+        )
+
+    def _score(
+        self, window: np.ndarray, position: int, epoch: int, submitted: float
+    ) -> None:
+        start = time.monotonic()
+        new_samples = position - self._position
+        if epoch != self._epoch or not 0 < new_samples <= len(window):
+            self._model.prime(window)
+            with self._condition:
+                self._prime_count += 1
+        else:
+            self._model.update(window[-new_samples:])
+        self._epoch = epoch
+        self._position = position
+
+        scores = self._model.scores(self._model_names)
+        done = time.monotonic()
+        latency = done - submitted
+        with self._condition:
+            self._inference_count += 1
+            if latency > self._deadline:
+                self._deadline_miss_count += 1
+        if self._inference_seconds is not None:
+            self._inference_seconds.observe(done - start)
+        if self._detection_latency_seconds is not None:
+            self._detection_latency_seconds.observe(latency)
+        if latency > self._deadline:
+            self._report_misses(done, latency)
+
+        if self._on_scores(scores):
+            # Windows already submitted still hold the old stream
+            self._model.reset()
+            with self._condition:
+                self._min_epoch = epoch + 1
+            self._epoch = None
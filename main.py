@@ -13,5 +13,8 @@ if __name__ == "__main__":
         addr_hour=config.get("addr_hour", 27),
         addr_min=config.get("addr_min", 1),
         enable_demo_mode=config.get("enable_demo_mode", False),
+        bus_profile=config.get("bus_profile"),
+        metrics_port=config.get("metrics_port"),
+        metrics_socket=config.get("metrics_socket"),
     )
     clock.run()
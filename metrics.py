@@ -0,0 +1,296 @@
+import bisect
+import math
+import os
+import socketserver
+import threading
+from collections.abc import Callable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+LabelValues = tuple[str, ...]
+# A metric read at scrape time returns one value, or one value per label set
+MetricFn = Callable[[], "float | dict[LabelValues, float] | None"]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: tuple[str, ...] = (),
+        fn: MetricFn | None = None,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._fn = fn
+        self._lock = threading.Lock()
+        self._values: dict[LabelValues, float] = {}
+
+    def _key(self, labels: LabelValues) -> LabelValues:
+        if len(labels) != len(self.label_names):
+            raise ValueError(
+                f"{self.name} takes labels {self.label_names}, got {labels}"
+            )
+        return tuple(str(v) for v in labels)
+
+    def _read(self) -> dict[LabelValues, float]:
+        if self._fn is None:
+            with self._lock:
+                return dict(self._values)
+        value = self._fn()
+        if value is None:
+            return {}
+        if isinstance(value, dict):
+            return value
+        return {(): value}
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        """(name with suffix, formatted labels, value) per sample."""
+        for labels, value in sorted(self._read().items()):
+            yield self.name, _format_labels(self.label_names, labels), value
+
+
+class Counter(_Metric):
+    """A value that only goes up, or a running total read at scrape time."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        if amount < 0:
+            raise ValueError("a counter cannot go down")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Count observations in cumulative buckets, like a Prometheus histogram."""
+
+    kind = "histogram"
+
+    DEFAULT_BUCKETS: tuple[float, ...] = (
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0
+    )
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        self._counts: list[int] = [0] * (len(self.buckets) + 1)
+        self._sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[bucket] += 1
+            self._sum += value
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for edge, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = _format_value(edge)
+            yield f"{self.name}_bucket", f'{{le="{le}"}}', cumulative
+        yield f"{self.name}_sum", "", total
+        yield f"{self.name}_count", "", cumulative
+
+
+class MetricsRegistry:
+    """Metrics of one process, rendered in the Prometheus text format.
+
+    Metrics are created once by name, asking for a name again returns the
+    existing metric, so a component that is rebuilt keeps its history.
+    Metrics with a ``fn`` are read when scraped, which lets existing stats()
+    methods be exported without touching the code that counts.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def _get_or_add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if type(existing) is not type(metric):
+            raise ValueError(f"{metric.name} is already a {existing.kind}")
+        return existing
+
+    def counter(
+        self,
+        name: str,
+        help_text: str,
+        label_names: tuple[str, ...] = (),
+        fn: MetricFn | None = None,
+    ) -> Counter:
+        return self._get_or_add(Counter(name, help_text, label_names, fn))
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        label_names: tuple[str, ...] = (),
+        fn: MetricFn | None = None,
+    ) -> Gauge:
+        return self._get_or_add(Gauge(name, help_text, label_names, fn))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        buckets: tuple[float, ...] = Histogram.DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_add(Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                print(f"[Metrics] Reading {metric.name} failed: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def thread_cpu_seconds() -> dict[LabelValues, float]:
+    """CPU seconds used by every Python thread, from /proc on Linux."""
+    names = {t.native_id: t.name for t in threading.enumerate()}
+    ticks_per_second = os.sysconf("SC_CLK_TCK")
+    cpu: dict[LabelValues, float] = {}
+    for native_id, name in names.items():
+        try:
+            stat = Path(f"/proc/self/task/{native_id}/stat").read_text()
+        except OSError:
+            continue
+        # The thread name in brackets may contain spaces, split after it
+        fields = stat[stat.rindex(")") + 2 :].split()
+        utime, stime = int(fields[11]), int(fields[12])
+        key = (name,)
+        cpu[key] = cpu.get(key, 0.0) + (utime + stime) / ticks_per_second
+    return cpu
+
+
+def _handler(registry: MetricsRegistry) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def address_string(self) -> str:
+            # Unix socket clients have no address
+            return str(self.client_address[0]) if self.client_address else "unix"
+
+        def log_message(self, format: str, *args) -> None:
+            pass  # A scrape every few seconds would flood the journal
+
+    return Handler
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class MetricsServer:
+    """Serve a registry over HTTP on a TCP port or a Unix socket.
+
+    GET /metrics returns the Prometheus text format, so a Prometheus or any
+    plain HTTP client can scrape the clock without logging in to the Pi.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        port: int | None = None,
+        host: str = "0.0.0.0",
+        unix_socket: str | None = None,
+    ) -> None:
+        if (port is None) == (unix_socket is None):
+            raise ValueError("Give either a port or a unix_socket")
+        self._unix_socket = unix_socket
+        handler = _handler(registry)
+        if unix_socket is not None:
+            Path(unix_socket).unlink(missing_ok=True)
+            self._server: socketserver.BaseServer = _UnixHTTPServer(
+                unix_socket, handler
+            )
+        else:
+            self._server = ThreadingHTTPServer((host, port), handler)
+            self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True, name="Metrics"
+        )
+
+    @property
+    def address(self) -> str:
+        if self._unix_socket is not None:
+            return self._unix_socket
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> None:
+        self._thread.start()
+        print(f"[Metrics] Serving on {self.address}")
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._unix_socket is not None:
+            Path(self._unix_socket).unlink(missing_ok=True)
@@ -0,0 +1,141 @@
+import platform
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as ort
+
+from streaming_model import StreamingWakeWordModel
+
+DEFAULT_CACHE_DIR = Path("resources/models/custom/.cache")
+
+
+class ModelCache:
+    """Build every wake word model once per process and warm it up.
+
+    ONNX Runtime optimizes a graph every time a session is created, and the
+    first runs of a fresh session still allocate their buffers. The cache
+    keeps one warmed model per set of model paths. With a ``cache_dir`` the
+    optimized graphs are also saved to disk, so later runs load them
+    without optimizing again.
+
+    The cached models keep streaming state, a model must only be used by
+    one detector at a time.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None = DEFAULT_CACHE_DIR,
+        warm_up_seconds: float = 2.0,
+        sample_rate: int = 16000,
+    ) -> None:
+        self._cache_dir: Path | None = cache_dir
+        self._warm_up_samples: int = int(warm_up_seconds * sample_rate)
+        self._lock = threading.Lock()
+        self._models: dict[tuple[str, ...], StreamingWakeWordModel] = {}
+        self._hits: int = 0
+        self._misses: int = 0
+        self._disk_hits: int = 0
+        self._disk_misses: int = 0
+        self._load_times: dict[tuple[str, ...], float] = {}
+
+    def get(self, models: list[str]) -> StreamingWakeWordModel:
+        """The warmed, reset model for these model paths."""
+        key = tuple(str(Path(m)) for m in models)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._hits += 1
+                print(f"[Model Cache] Hit for {', '.join(key)}")
+                model.reset()
+                return model
+
+            self._misses += 1
+            start = time.monotonic()
+            model = StreamingWakeWordModel(
+                models=list(key), prepare_session=self._prepare_session
+            )
+            loaded = time.monotonic()
+            self._warm_up(model)
+            done = time.monotonic()
+            self._models[key] = model
+            self._load_times[key] = done - start
+            print(
+                f"[Model Cache] Miss for {', '.join(key)}: loaded in "
+                f"{loaded - start:.2f}s, warmed up in {done - loaded:.2f}s"
+            )
+            return model
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "disk_hits": self._disk_hits,
+                "disk_misses": self._disk_misses,
+                "load_times": {
+                    ", ".join(key): seconds for key, seconds in self._load_times.items()
+                },
+            }
+
+    def _warm_up(self, model: StreamingWakeWordModel) -> None:
+        # Runs every session once with the window sizes used while listening
+        window = np.zeros(self._warm_up_samples, dtype=np.int16)
+        model.predict(window)
+        model.update(window[: len(window) // 2])
+        model.scores()
+        model.reset()
+
+    def _optimized_path(self, model_path: Path) -> Path:
+        # Optimized graphs may use operators of this runtime version and CPU
+        tag = f"{ort.__version__}-{platform.machine()}"
+        return self._cache_dir / f"{model_path.stem}.{tag}.onnx"
+
+    def _prepare_session(
+        self, model_path: Path, sess_options: ort.SessionOptions | None
+    ) -> tuple[Path, ort.SessionOptions]:
+        # Fresh options per session, the caller's options may be shared
+        options = ort.SessionOptions()
+        if sess_options is not None:
+            options.intra_op_num_threads = sess_options.intra_op_num_threads
+            options.inter_op_num_threads = sess_options.inter_op_num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self._cache_dir is None:
+            return model_path, options
+
+        optimized_path = self._optimized_path(model_path)
+        if (
+            optimized_path.exists()
+            and optimized_path.stat().st_mtime >= model_path.stat().st_mtime
+        ):
+            # Only the cheap layout optimizations are left to do
+            self._disk_hits += 1
+            return optimized_path, options
+
+        self._disk_misses += 1
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            print(f"[Model Cache] Cannot write {self._cache_dir}: {e}")
+            return model_path, options
+        # Layout optimizations above this level are specific to the CPU the
+        # graph was optimized on and must not be saved
+        options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        )
+        options.optimized_model_filepath = str(optimized_path)
+        return model_path, options
+
+
+_default_cache: ModelCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache() -> ModelCache:
+    """The model cache shared by the whole process."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ModelCache()
+        return _default_cache
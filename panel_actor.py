@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+
+from sbb_fallblatt import sbb_rs485
+
+
+class PanelClockActor:
+    """Own a PanelClockControl and talk to the bus from a dedicated thread.
+
+    Callers only post the time they want to show and never block on the
+    bus. Only the latest target matters, so a target that is still waiting
+    when a newer one arrives is replaced instead of queued. Position reads
+    are queued and sent after a waiting target.
+    """
+
+    def __init__(self, panel: sbb_rs485.PanelClockControl) -> None:
+        self._panel = panel
+        self._condition = threading.Condition()
+        self._pending: tuple[int, int, Callable[[float], None] | None] | None = None
+        self._reads: deque[tuple[int, Callable[[int | None], None]]] = deque()
+        self._busy: bool = False
+        self._stopped: bool = False
+        self._sent_count: int = 0
+        self._coalesced_count: int = 0
+        self._read_count: int = 0
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="PanelActor"
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """Send the pending target, then stop the thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def set_time(
+        self,
+        hour: int,
+        minute: int,
+        on_sent: Callable[[float], None] | None = None,
+    ) -> None:
+        """Show hour:minute as soon as the bus is free.
+
+        Args:
+            on_sent: Called on the actor thread with the seconds the update
+                spent on the bus. Not called if a newer target replaces this
+                one before it is sent.
+        """
+        with self._condition:
+            if self._pending is not None:
+                self._coalesced_count += 1
+            self._pending = (hour, minute, on_sent)
+            self._condition.notify_all()
+
+    def read_position(self, addr: int, on_read: Callable[[int | None], None]) -> None:
+        """Read the position of a module as soon as the bus is free.
+
+        Args:
+            on_read: Called on the actor thread with the position, None if
+                the module did not answer.
+        """
+        with self._condition:
+            self._reads.append((addr, on_read))
+            self._condition.notify_all()
+
+    def _idle(self) -> bool:
+        return self._pending is None and not self._reads and not self._busy
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Wait until every posted target has been sent and read done."""
+        with self._condition:
+            return self._condition.wait_for(self._idle, timeout)
+
+    def metrics(self) -> dict[str, int]:
+        with self._condition:
+            return {
+                "queue_depth": int(self._pending is not None)
+                + len(self._reads)
+                + int(self._busy),
+                "sent": self._sent_count,
+                "coalesced": self._coalesced_count,
+                "reads": self._read_count,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._pending is not None or self._reads or self._stopped
+                )
+                if self._pending is None and not self._reads:
+                    return
+                self._busy = True
+                if self._pending is None:
+                    read = self._reads.popleft()
+                else:
+                    read = None
+                    hour, minute, on_sent = self._pending
+                    self._pending = None
+
+            if read is not None:
+                self._read(*read)
+                continue
+
+            try:
+                prepared = self._panel.prepare_time(hour, minute)
+                start = time.monotonic()
+                self._panel.send_prepared(prepared)
+                bus_time = time.monotonic() - start
+                if on_sent:
+                    on_sent(bus_time)
+            except Exception as e:
+                print(f"[Panel Actor] Sending {hour:02d}:{minute:02d} failed: {e}")
+
+            with self._condition:
+                self._busy = False
+                self._sent_count += 1
+                self._condition.notify_all()
+
+    def _read(self, addr: int, on_read: Callable[[int | None], None]) -> None:
+        try:
+            status, pos = self._panel.read_positions([addr], retries=0)[addr]
+            on_read(pos if status == self._panel.READ_OK else None)
+        except Exception as e:
+            print(f"[Panel Actor] Reading module {addr} failed: {e}")
+
+        with self._condition:
+            self._busy = False
+            self._read_count += 1
+            self._condition.notify_all()
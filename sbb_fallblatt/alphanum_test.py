@@ -2,10 +2,11 @@
 # -*- coding: utf-8 -*-
 
 from . import sbb_rs485
+from . import motion
 import time
 from datetime import datetime
 
-DELAY_TIME = 4
+MOTION = motion.MotionModel(motion.MotionModel.BLADES_ALPHANUM)
 
 POS_A = 0
 POS_E = 4
@@ -35,6 +36,17 @@ def fmt_ser(ser):
     ss=str(hex(ser[0]))[2:].upper() + str(hex(ser[1]))[2:].upper() + str(hex(ser[2]))[2:].upper() + str(hex(ser[3]))[2:].upper()
     return ss
 
+def move(cc, addr, current, target):
+    cc.serial.flushInput()
+    started = time.monotonic()
+    cc.set_position(addr, target, force=True)
+    # the default timing only says when to start polling, a slower but
+    # healthy module must still pass
+    MOTION.wait_until_settled(cc, addr, target, current, started,
+                              verify=True, timeout=4)
+    cc.serial.flushInput()
+    return cc.get_position(addr)
+
 def main():
     cc = sbb_rs485.PanelControl()
     cc.connect()
@@ -51,31 +63,22 @@ def main():
         else:
             log(LOG_FAIL, "reading serial")
 
-        cc.serial.flushInput()
-        cc.set_position(addr_int, POS_E)
-        time.sleep(DELAY_TIME)
         cc.serial.flushInput()
         pos = cc.get_position(addr_int)
+
+        pos = move(cc, addr_int, pos, POS_E)
         if pos == POS_E:
             log(LOG_OK, "position E")
         else:
             log(LOG_FAIL, "position E")
 
-        cc.serial.flushInput()
-        cc.set_position(addr_int, POS_Z)
-        time.sleep(DELAY_TIME)
-        cc.serial.flushInput()
-        pos = cc.get_position(addr_int)
+        pos = move(cc, addr_int, pos, POS_Z)
         if pos == POS_Z:
             log(LOG_OK, "position Z")
         else:
             log(LOG_FAIL, "position Z")
 
-        cc.serial.flushInput()
-        cc.set_position(addr_int, POS_5)
-        time.sleep(DELAY_TIME)
-        cc.serial.flushInput()
-        pos = cc.get_position(addr_int)
+        pos = move(cc, addr_int, pos, POS_5)
         if pos == POS_5:
             log(LOG_OK, "position 5")
         else:
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""asyncio front end for a PanelControl bus"""
+
+import sys
+import asyncio
+import itertools
+import concurrent.futures
+
+
+class AsyncPanelControl:
+    """Share one RS485 bus between many coroutines.
+
+    A single bus-owner coroutine takes commands from a priority queue and
+    runs them one at a time on a dedicated I/O thread, so frames and replies
+    of different clients never interleave on the wire.
+    """
+
+    PRIO_HIGH   = 0
+    PRIO_NORMAL = 1
+    PRIO_LOW    = 2
+
+    _PRIO_STOP  = sys.maxsize
+
+    def __init__(self, panel):
+        self.panel = panel
+        self._seq = itertools.count()
+        self._queue = None
+        self._owner = None
+        self._executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.stop()
+
+    async def start(self):
+        """Connect the panel if needed and start the bus owner"""
+        if self._owner is not None:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="rs485"
+        )
+        if not getattr(self.panel, "serial", None):
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.panel.connect
+            )
+        self._owner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Finish all queued commands, then stop the bus owner"""
+        if self._owner is None:
+            return
+        await self._queue.put((self._PRIO_STOP, next(self._seq), None, (), None))
+        await self._owner
+        self._owner = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, func, args, future = await self._queue.get()
+            if func is None:
+                return
+            if future.cancelled():
+                continue
+            try:
+                result = await loop.run_in_executor(self._executor, func, *args)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+
+    def submit(self, func, *args, priority=PRIO_NORMAL):
+        """Queue func(*args) for the bus owner and return a future"""
+        if self._owner is None:
+            raise RuntimeError("AsyncPanelControl is not started")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._seq), func, args, future))
+        return future
+
+    def queue_depth(self):
+        """Number of commands waiting for the bus"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def call(self, func, *args, priority=PRIO_NORMAL):
+        """Run func(*args) with exclusive access to the bus"""
+        return await self.submit(func, *args, priority=priority)
+
+    async def get_position(self, addr, priority=PRIO_NORMAL):
+        return await self.submit(self.panel.get_position, addr, priority=priority)
+
+    async def get_serial_number(self, addr, priority=PRIO_NORMAL):
+        return await self.submit(self.panel.get_serial_number, addr, priority=priority)
+
+    async def read_positions(self, addrs, reply_timeout=None, retries=1, priority=PRIO_NORMAL):
+        return await self.submit(
+            self.panel.read_positions, addrs, reply_timeout, retries, priority=priority
+        )
+
+    async def set_position(self, addr, pos, force=False, priority=PRIO_NORMAL):
+        return await self.submit(self.panel.set_position, addr, pos, force, priority=priority)
+
+    async def send_targets(self, targets, force=False, priority=PRIO_NORMAL):
+        return await self.submit(self.panel.send_targets, targets, force, priority=priority)
+
+    async def send_batch(self, msgs, priority=PRIO_NORMAL):
+        return await self.submit(self.panel.send_batch, msgs, priority=priority)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from . import sbb_rs485
+import sys
+import json
+import argparse
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Measure the bus timing profile of an SBB panel")
+    parser.add_argument(
+        '--port',
+        '-p',
+        help="Serial port",
+        type=str,
+        required=True
+    )
+    parser.add_argument(
+        '--addr',
+        '-a',
+        help="Address of a module on the bus",
+        type=int,
+        required=True
+    )
+    parser.add_argument(
+        '--output',
+        '-o',
+        help="Write the profile as JSON to this file",
+        type=str
+    )
+    args = parser.parse_args()
+
+    cc = sbb_rs485.PanelControl(args.port)
+    cc.connect()
+    if not cc.serial:
+        sys.exit(1)
+    profile = cc.measure_profile(args.addr)
+    cc.serial.close()
+    if profile is None:
+        print("ERROR: module {0} does not answer".format(args.addr))
+        sys.exit(1)
+
+    print(json.dumps(profile.to_dict(), indent=4))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(profile.to_dict(), f, indent=4)
+    sys.exit(0)
+
+
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Record what a PanelControl puts on the wire and how long it takes"""
+
+import json
+import time
+import struct
+import threading
+import collections
+
+
+EVENT_BREAK   = 1
+EVENT_WRITE   = 2
+EVENT_REPLY   = 3
+EVENT_TIMEOUT = 4
+
+EVENT_NAMES = {
+    EVENT_BREAK: "break",
+    EVENT_WRITE: "write",
+    EVENT_REPLY: "reply",
+    EVENT_TIMEOUT: "timeout",
+}
+
+COMMAND_NAMES = {
+    0xC0: "GOTO",
+    0xC5: "ZERO",
+    0xC6: "STEP",
+    0xC7: "PULSE",
+    0xCB: "CALIBRATE_SET",
+    0xCC: "CALIBRATE_START",
+    0xCE: "CHANGE_ADDR",
+    0xD0: "READ_POS",
+    0xDF: "READ_SERIAL",
+}
+
+# pcap with a user link type, nanosecond timestamps
+PCAP_MAGIC_NS  = 0xA1B23C4D
+PCAP_LINKTYPE  = 147  # LINKTYPE_USER0
+PCAP_SNAPLEN   = 65535
+# event type, command, address, duration in microseconds
+RECORD_HEADER  = struct.Struct("<BBBI")
+
+
+def command_name(cmd):
+    if cmd is None:
+        return None
+    return COMMAND_NAMES.get(cmd, "0x{0:02X}".format(cmd))
+
+
+def percentile(values, fraction):
+    """Nearest rank percentile of sorted values"""
+    if not values:
+        return None
+    rank = min(int(fraction * len(values)), len(values) - 1)
+    return values[rank]
+
+
+class BusTracer:
+    """Keep the last capacity bus events in a ring buffer
+
+    Every event is one tuple of (monotonic time, event type, command,
+    address, duration, bytes). Writes are split into frames on the 0xFF
+    start byte, a reply or timeout belongs to the last frame written before
+    the read. Durations are in seconds: how long the break was held, the
+    write (and flush) took, or the reply took after the request was sent.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.events = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._mono_start = time.monotonic()
+        self._wall_start = time.time()
+        self._request = (None, None)
+        self._tx_done = None
+        self._break_start = None
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+
+    def _add(self, t, event, cmd, addr, duration, data=b""):
+        with self._lock:
+            self.events.append((t, event, cmd, addr, duration, bytes(data)))
+
+    def break_started(self):
+        self._break_start = time.monotonic()
+
+    def break_ended(self):
+        if self._break_start is None:
+            return
+        now = time.monotonic()
+        self._add(self._break_start, EVENT_BREAK, None, None, now - self._break_start)
+        self._break_start = None
+
+    def wrote(self, start, data, duration):
+        data = bytes(data)
+        frames = [ b"\xFF" + frame for frame in data.split(b"\xFF")[1:] ]
+        if not frames:
+            frames = [ data ]
+        for frame in frames:
+            cmd = frame[1] if len(frame) > 1 else None
+            addr = frame[2] if len(frame) > 2 else None
+            self._add(start, EVENT_WRITE, cmd, addr, duration, frame)
+            self._request = (cmd, addr)
+        self._tx_done = start + duration
+
+    def flushed(self):
+        self._tx_done = time.monotonic()
+
+    def replied(self, data, size):
+        now = time.monotonic()
+        latency = now - self._tx_done if self._tx_done is not None else 0.0
+        cmd, addr = self._request
+        event = EVENT_REPLY if len(data) == size else EVENT_TIMEOUT
+        self._add(now, event, cmd, addr, latency, data)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.events)
+
+    def wall_time(self, t):
+        return self._wall_start + (t - self._mono_start)
+
+    def stats(self, by_addr=False):
+        """Per command counts and reply latency percentiles in seconds
+
+        With by_addr the commands are also split by module address, keyed
+        like READ_POS@27, to find the one module that is slow or flaky.
+        """
+        latencies = collections.defaultdict(list)
+        writes = collections.defaultdict(list)
+        timeouts = collections.Counter()
+        for _, event, cmd, addr, duration, _ in self.snapshot():
+            name = command_name(cmd)
+            if by_addr:
+                name = "{0}@{1}".format(name, addr)
+            if event == EVENT_WRITE:
+                writes[name].append(duration)
+            elif event == EVENT_REPLY:
+                latencies[name].append(duration)
+            elif event == EVENT_TIMEOUT:
+                timeouts[name] += 1
+
+        stats = {}
+        for name in set(writes) | set(latencies) | set(timeouts):
+            reply = sorted(latencies[name])
+            write = sorted(writes[name])
+            stats[name] = {
+                "frames": len(write),
+                "replies": len(reply),
+                "timeouts": timeouts[name],
+                "write_p50": percentile(write, 0.5),
+                "reply_p50": percentile(reply, 0.5),
+                "reply_p90": percentile(reply, 0.9),
+                "reply_p99": percentile(reply, 0.99),
+                "reply_max": reply[-1] if reply else None,
+            }
+        return stats
+
+    def dump_jsonl(self, f):
+        """Write one JSON object per event to a text file object"""
+        for t, event, cmd, addr, duration, data in self.snapshot():
+            f.write(json.dumps({
+                "time": round(self.wall_time(t), 6),
+                "event": EVENT_NAMES[event],
+                "cmd": command_name(cmd),
+                "addr": addr,
+                "duration": round(duration, 6),
+                "data": data.hex(),
+            }) + "\n")
+
+    def dump_pcap(self, f):
+        """Write the events as a pcap to a binary file object
+
+        Every packet is a RECORD_HEADER (event, command, address and the
+        duration in microseconds, 0xFF for no command or address) followed
+        by the bytes on the wire.
+        """
+        f.write(struct.pack("<IHHiIII", PCAP_MAGIC_NS, 2, 4, 0, 0,
+                            PCAP_SNAPLEN, PCAP_LINKTYPE))
+        for t, event, cmd, addr, duration, data in self.snapshot():
+            wall = self.wall_time(t)
+            sec = int(wall)
+            nsec = int((wall - sec) * 1e9)
+            payload = RECORD_HEADER.pack(
+                event,
+                0xFF if cmd is None else cmd,
+                0xFF if addr is None else addr,
+                min(int(duration * 1e6), 0xFFFFFFFF),
+            ) + data
+            f.write(struct.pack("<IIII", sec, nsec, len(payload), len(payload)))
+            f.write(payload)
+
+
+class TracingSerial:
+    """Wrap a serial port and report breaks, writes and reads to a BusTracer
+
+    Everything else is passed through, so the panel code and the scanner
+    keep using the port as before.
+    """
+
+    def __init__(self, port, tracer):
+        object.__setattr__(self, "port", port)
+        object.__setattr__(self, "tracer", tracer)
+
+    def __getattr__(self, name):
+        return getattr(self.port, name)
+
+    def __setattr__(self, name, value):
+        if name == "break_condition":
+            if value:
+                self.tracer.break_started()
+            self.port.break_condition = value
+            if not value:
+                self.tracer.break_ended()
+            return
+        setattr(self.port, name, value)
+
+    def __bool__(self):
+        return bool(self.port)
+
+    def write(self, data):
+        start = time.monotonic()
+        written = self.port.write(data)
+        self.tracer.wrote(start, data, time.monotonic() - start)
+        return written
+
+    def flush(self):
+        self.port.flush()
+        self.tracer.flushed()
+
+    def read(self, size=1):
+        data = self.port.read(size)
+        self.tracer.replied(data, size)
+        return data
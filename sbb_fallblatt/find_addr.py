@@ -2,7 +2,11 @@
 # -*- coding: utf-8 -*-
 
 from . import sbb_rs485
+from . import scanner
+import sys
+import json
 import time
+import argparse
 from datetime import datetime
 
 
@@ -33,20 +37,50 @@ def fmt_ser(ser):
     ss=str(hex(ser[0]))[2:].upper() + str(hex(ser[1]))[2:].upper() + str(hex(ser[2]))[2:].upper() + str(hex(ser[3]))[2:].upper()
     return ss
 
+def parse_args(arguments):
+    parser = argparse.ArgumentParser(description="Find all modules on SBB buses")
+    parser.add_argument(
+        'ports',
+        help="Serial ports to scan",
+        type=str,
+        nargs='*',
+        default=["/dev/ttyUSB0"]
+    )
+    parser.add_argument(
+        '--profile',
+        '-p',
+        help="Bus profile JSON written by bus_profile",
+        type=str
+    )
+    parser.add_argument(
+        '--timeout',
+        '-t',
+        help="Initial reply timeout in seconds",
+        type=float,
+        default=0.03
+    )
+    return parser.parse_args(arguments)
+
+
 def main():
-    cc = sbb_rs485.PanelClockControl()
-    cc.connect()
-    cc.serial.timeout = 2
-    exit = False
-
-    input("Press any key")
-    for i in range(0,256):
-        cc.set_addr_test(i)
-        print("Trying address {0}{1}{2}".format(bcolors.BOLD, i, bcolors.ENDC))
-        serial = cc.get_serial_number(i)
-        if len(serial)==4:
-            print("Module address is: {0}{1}{2}".format(bcolors.BOLD, i, bcolors.ENDC))
-            break
+    args = parse_args(sys.argv[1:])
+    profile = None
+    if args.profile:
+        with open(args.profile) as f:
+            profile = sbb_rs485.BusProfile.from_dict(json.load(f))
+
+    start = time.monotonic()
+    found = scanner.scan_ports(args.ports, profile=profile, timeout=args.timeout)
+    for port, modules in found.items():
+        print("{0}{1}{2}: {3} module(s)".format(bcolors.BOLD, port, bcolors.ENDC, len(modules)))
+        for addr, serial in sorted(modules.items()):
+            log(LOG_OK, "address {0}{1}{2} serial {3}".format(
+                bcolors.BOLD,
+                addr,
+                bcolors.ENDC,
+                fmt_ser(serial)
+            ))
+    print("Scan took {0:.1f}s".format(time.monotonic() - start))
 
 
 
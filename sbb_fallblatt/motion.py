@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Predict when the blades of a module have settled"""
+
+import time
+import asyncio
+
+
+class MotionModel:
+    """Settle time of one module as start_time + steps * step_time.
+
+    Blades only turn forward, so the number of steps from the current to
+    the target position wraps around at blade_count. An unknown current
+    position is treated as the worst case of a full turn.
+    """
+
+    BLADES_ALPHANUM = 40
+    BLADES_MINUTE   = 62
+
+    def __init__(self, blade_count=BLADES_ALPHANUM, step_time=0.09, start_time=0.15):
+        self.blade_count = blade_count
+        self.step_time = step_time
+        self.start_time = start_time
+        self.samples = []
+
+    def steps(self, current, target):
+        """Number of blades that fall between current and target"""
+        if current is None or current < 0:
+            return self.blade_count - 1
+        return (target - current) % self.blade_count
+
+    def settle_time(self, current, target):
+        """Predicted seconds from the GOTO until target is showing"""
+        steps = self.steps(current, target)
+        if steps == 0:
+            return 0.0
+        return self.start_time + steps * self.step_time
+
+    def deadline(self, current, target, started=None):
+        """Monotonic time at which target is predicted to be showing"""
+        if started is None:
+            started = time.monotonic()
+        return started + self.settle_time(current, target)
+
+    def add_sample(self, steps, elapsed):
+        self.samples.append((steps, elapsed))
+
+    def fit(self):
+        """Least squares fit of start_time and step_time to the samples"""
+        samples = [(s, e) for s, e in self.samples if s > 0]
+        if not samples:
+            return
+        n = len(samples)
+        mean_s = sum(s for s, _ in samples) / n
+        mean_e = sum(e for _, e in samples) / n
+        var_s = sum((s - mean_s) ** 2 for s, _ in samples)
+        if var_s == 0:
+            # a single distance only tells the total, keep the start time
+            self.step_time = max(mean_e - self.start_time, 0) / mean_s
+            return
+        cov = sum((s - mean_s) * (e - mean_e) for s, e in samples)
+        self.step_time = max(cov / var_s, 0)
+        self.start_time = max(mean_e - self.step_time * mean_s, 0)
+
+    def calibrate(self, panel, addr, targets, poll=0.02, timeout=10):
+        """Time moves to each target by polling the module, then fit"""
+        for target in targets:
+            current = panel.get_position(addr)
+            start = time.monotonic()
+            panel.set_position(addr, target, force=True)
+            reached = self._poll(panel, addr, target, start + timeout, poll)
+            if reached is not None and current >= 0:
+                self.add_sample(self.steps(current, target), reached - start)
+        self.fit()
+
+    def _poll(self, panel, addr, target, deadline, poll):
+        while time.monotonic() < deadline:
+            status, pos = panel.read_positions([addr], retries=0)[addr]
+            if status == panel.READ_OK and pos == target:
+                return time.monotonic()
+            time.sleep(poll)
+        return None
+
+    def wait_until_settled(self, panel, addr, target, current=None, started=None,
+                           verify=False, poll=0.02, timeout=2.0):
+        """Block until the module is predicted (and optionally read) at target.
+
+        Returns False only if verify is set and the module did not report
+        target within timeout seconds after the predicted deadline.
+        """
+        delay = self.deadline(current, target, started) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if not verify:
+            return True
+        return self._poll(panel, addr, target, time.monotonic() + timeout, poll) is not None
+
+    async def async_wait_until_settled(self, bus, addr, target, current=None, started=None,
+                                       verify=False, poll=0.02, timeout=2.0):
+        """wait_until_settled for an AsyncPanelControl"""
+        delay = self.deadline(current, target, started) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if not verify:
+            return True
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            status, pos = (await bus.read_positions([addr], retries=0))[addr]
+            if status == bus.panel.READ_OK and pos == target:
+                return True
+            await asyncio.sleep(poll)
+        return False
@@ -3,19 +3,135 @@
 import os
 import sys
 import pty
+import time
+import select
 import struct
 import argparse
 from sbb_fallblatt import sbb_rs485
+from sbb_fallblatt.motion import MotionModel
+
+
+class MockModule():
+    """Simulates a single module with its own address, serial and blades
+
+    Blades only turn forward. After a GOTO the first blade falls start_time
+    plus step_time later and every further one step_time after that, the
+    same timing MotionModel predicts. Reading the position while the
+    module turns returns the blade that is showing at that moment.
+    """
+
+    PULSES_PER_STEP = 8
+
+    def __init__(self, addr, serial=None, blade_count=MotionModel.BLADES_ALPHANUM,
+                 step_time=0.09, start_time=0.15, position=0):
+        self.addr = addr
+        self.serial = serial if serial is not None else struct.pack(">I", 0x01883F00 + addr)
+        self.blade_count = blade_count
+        self.step_time = step_time
+        self.start_time = start_time
+        self.calibrating = False
+        self.pulses = 0
+        self._origin = position
+        self._target = position
+        self._started = 0.0
+
+    def position(self, now):
+        """Blade showing at monotonic time now"""
+        steps = (self._target - self._origin) % self.blade_count
+        if steps == 0:
+            return self._target
+        if self.step_time <= 0:
+            return self._target
+        elapsed = now - self._started - self.start_time
+        fallen = min(max(int(elapsed // self.step_time), 0), steps)
+        return (self._origin + fallen) % self.blade_count
+
+    def settled(self, now):
+        return self.position(now) == self._target
+
+    def _move_to(self, pos, now):
+        self._origin = self.position(now)
+        self._target = pos % self.blade_count
+        self._started = now
+
+    def _jump_to(self, pos):
+        self._origin = self._target = pos % self.blade_count
+
+    def goto(self, pos, now):
+        if pos >= self.blade_count:
+            return
+        self._move_to(pos, now)
+
+    def zero(self, now):
+        self._move_to(0, now)
+
+    def step(self, now):
+        """Turn the motor by one blade"""
+        self._jump_to(self.position(now) + 1)
+
+    def pulse(self, now):
+        """Turn the motor by a fraction of a blade"""
+        self.pulses += 1
+        if self.pulses >= self.PULSES_PER_STEP:
+            self.pulses = 0
+            self.step(now)
+
+    def calibrate_start(self, now):
+        self._jump_to(self.position(now))
+        self.calibrating = True
+        self.pulses = 0
+
+    def calibrate_finish(self, pos):
+        """Store the blade showing now as pos"""
+        if not self.calibrating or pos >= self.blade_count:
+            return
+        self._jump_to(pos)
+        self.calibrating = False
+
 
 class MockPanel():
-    """This class is used to Mock an SBB Fallblatt Panel"""
+    """This class is used to Mock an SBB Fallblatt Panel
+
+    Frames are parsed from bulk reads of the pty and resynchronised on the
+    0xFF start byte. A pty carries no break condition, so with break_gap
+    set an idle gap of at least that long stands in for the break and drops
+    a partial frame, like a module that sees a break mid frame. Addresses
+    without a module stay silent.
+    """
+
+    CMD_CALIBRATE_START = b'\xCC'
+    CMD_CALIBRATE_SET   = b'\xCB'
 
-    def __init__(self, start_address=10, end_address=64):
+    # bytes after the command byte
+    FRAME_ARGS = {
+        sbb_rs485.PanelControl.CMD_GOTO: 2,
+        sbb_rs485.PanelControl.CMD_ZERO: 1,
+        sbb_rs485.PanelControl.CMD_STEP: 1,
+        sbb_rs485.PanelControl.CMD_PULSE: 1,
+        sbb_rs485.PanelControl.CMD_READ_POS: 1,
+        sbb_rs485.PanelControl.CMD_READ_SERIAL: 1,
+        sbb_rs485.PanelControl.CMD_CHANGE_ADDR: 2,
+        CMD_CALIBRATE_START: 1,
+        CMD_CALIBRATE_SET: 2,
+    }
+
+    def __init__(self, start_address=10, end_address=64, modules=None,
+                 reply_delay=0.0, break_gap=None, time_fn=time.monotonic):
         self._stop = False
         self.start_address = start_address
-        self.panel_length = len(list(range(self.start_address, end_address+1)))
         self.panel = sbb_rs485.PanelAlphanumControl([0,1])
-        self.panel_data = [' ']*self.panel_length
+        self.reply_delay = reply_delay
+        self.break_gap = break_gap
+        self.time_fn = time_fn
+        if modules is None:
+            modules = [
+                MockModule(addr, step_time=0, start_time=0, position=self.panel.POS_BLANK)
+                for addr in range(start_address, end_address+1)
+            ]
+        self.modules = {module.addr: module for module in modules}
+        self.stats = {"frames": 0, "bad_frames": 0, "breaks": 0, "unknown_addr": 0}
+        self._pending = b""
+        self._last_rx = None
 
         self.serial_int, self.serial_out = pty.openpty()
 
@@ -31,59 +147,166 @@ class MockPanel():
         """Function to pack content into a data struct"""
         return struct.pack( "=B", data )
 
+    @property
+    def panel_data(self):
+        """Characters showing on the alphanumeric modules, by address"""
+        now = self.time_fn()
+        return [
+            self.panel.pos_to_str([module.position(now) % len(self.panel.ALPHANUM_MAPPING)])
+            for _, module in sorted(self.modules.items())
+        ]
+
+    def module(self, addr):
+        return self.modules.get(addr)
+
+    def open_serial(self):
+        """Serial port object that talks to this mock without the pty"""
+        return MockSerial(self)
+
+    def line_break(self):
+        """Break condition on the bus, drops a partial frame"""
+        self.stats["breaks"] += 1
+        if self._pending:
+            self.stats["bad_frames"] += 1
+        self._pending = b""
+
     def stop(self):
         """Stop the execution of the run loop"""
         self._stop = True
 
+    def feed(self, data, now=None):
+        """Parse received bytes, return the reply bytes"""
+        if now is None:
+            now = self.time_fn()
+        if (self.break_gap is not None and self._last_rx is not None
+                and now - self._last_rx >= self.break_gap):
+            self.line_break()
+        self._last_rx = now
+
+        buf = self._pending + data
+        replies = []
+        pos = 0
+        while True:
+            start = buf.find(b'\xFF', pos)
+            if start < 0:
+                pos = len(buf)
+                break
+            if start > pos:
+                self.stats["bad_frames"] += 1
+            if start + 2 > len(buf):
+                pos = start
+                break
+            cmd = buf[start+1:start+2]
+            nargs = self.FRAME_ARGS.get(cmd)
+            if nargs is None:
+                # not a command, resync on the next start byte
+                self.stats["bad_frames"] += 1
+                pos = start + 1
+                continue
+            end = start + 2 + nargs
+            if end > len(buf):
+                pos = start
+                break
+            self.stats["frames"] += 1
+            reply = self.handle_frame(cmd, buf[start+2:end], now)
+            if reply:
+                replies.append(reply)
+            pos = end
+        self._pending = buf[pos:]
+        return b"".join(replies)
+
+    def handle_frame(self, cmd, args, now):
+        """Apply one frame, return the reply bytes"""
+        module = self.modules.get(args[0])
+        if module is None:
+            self.stats["unknown_addr"] += 1
+            return b""
+        ctl = sbb_rs485.PanelControl
+        if cmd == ctl.CMD_GOTO:
+            module.goto(args[1], now)
+        elif cmd == ctl.CMD_ZERO:
+            module.zero(now)
+        elif cmd == ctl.CMD_STEP:
+            module.step(now)
+        elif cmd == ctl.CMD_PULSE:
+            module.pulse(now)
+        elif cmd == ctl.CMD_CHANGE_ADDR:
+            if args[1] not in self.modules:
+                del self.modules[module.addr]
+                module.addr = args[1]
+                self.modules[module.addr] = module
+        elif cmd == self.CMD_CALIBRATE_START:
+            module.calibrate_start(now)
+        elif cmd == self.CMD_CALIBRATE_SET:
+            module.calibrate_finish(args[1])
+        elif cmd == ctl.CMD_READ_POS:
+            return self.pack(module.position(now))
+        elif cmd == ctl.CMD_READ_SERIAL:
+            return module.serial
+        return b""
+
     def run(self):
         """Main mock loop"""
+        while not self._stop:
+            ready, _, _ = select.select([self.serial_int], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.serial_int, 4096)
+            except OSError:
+                return
+            reply = self.feed(data)
+            if reply:
+                if self.reply_delay:
+                    time.sleep(self.reply_delay)
+                os.write(self.serial_int, reply)
 
-        # mainloop
-        msg_start = False
-        msg_type  = False
-        addr      = False
+class MockSerial():
+    """In-process stand-in for serial.Serial wired straight to a MockPanel
 
-        while not self._stop:
+    Replies are available as soon as the request is written, so a driver
+    using it never waits on the bus. Bytes written during a break are lost.
+    """
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.timeout = None
+        self.is_open = True
+        self._break_condition = False
+        self._rx = bytearray()
+
+    @property
+    def break_condition(self):
+        return self._break_condition
+
+    @break_condition.setter
+    def break_condition(self, value):
+        if value and not self._break_condition:
+            self.panel.line_break()
+        self._break_condition = value
+
+    @property
+    def in_waiting(self):
+        return len(self._rx)
+
+    def write(self, data):
+        if not self._break_condition:
+            self._rx += self.panel.feed(bytes(data))
+        return len(data)
+
+    def read(self, size=1):
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
 
-            data = os.read(self.serial_int, 1)
-
-            if data == b'\xFF':
-                msg_start = True
-            if msg_start:
-                if not msg_type:
-                    if data == b'\xc0':
-                        msg_type = 'set'
-                    if data == b'\xd0':
-                        msg_type = 'get'
-                    if data == b'\xdf':
-                        msg_type = 'serial'
-
-                elif msg_type and not addr:
-                    addr = data
-
-                elif msg_type=='set' and addr:
-                    char = self.panel.pos_to_str( [ self.unpack(data) ] )
-                    paddr = self.unpack(addr) - (self.start_address)
-                    self.panel_data[paddr] = char
-                    msg_start = False
-                    msg_type  = False
-                    addr      = False
-
-                if msg_type=='get' and addr:
-                    paddr = self.unpack(addr) - self.start_address
-                    if paddr <= len(self.panel_data):
-                        os.write(self.serial_int,
-                                bytes(self.panel.str_to_pos(self.panel_data[paddr])))
-                    msg_start = False
-                    msg_type  = False
-                    addr      = False
-
-                if msg_type=='serial' and addr:
-                    paddr = self.unpack(addr) - self.start_address
-                    os.write(self.serial_int, b"\x01\x88\x3f\x00")
-                    msg_start = False
-                    msg_type  = False
-                    addr      = False
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+    def close(self):
+        self.is_open = False
 
 def parse_args(arguments):
     """Parse the CLI Arguments"""
@@ -102,11 +325,41 @@ def parse_args(arguments):
         type=int,
         required=True
     )
+    parser.add_argument(
+        '--blades',
+        help="Blades per module",
+        type=int,
+        default=MotionModel.BLADES_ALPHANUM
+    )
+    parser.add_argument(
+        '--step-time',
+        help="Seconds per blade, 0 to flip instantly",
+        type=float,
+        default=0.09
+    )
+    parser.add_argument(
+        '--start-time',
+        help="Seconds before the first blade falls",
+        type=float,
+        default=0.15
+    )
+    parser.add_argument(
+        '--reply-delay',
+        help="Seconds before a module answers",
+        type=float,
+        default=0.0
+    )
 
     return parser.parse_args(arguments)
 
 if __name__ == "__main__":
     args = parse_args(sys.argv[1:])
-    mock_panel = MockPanel(args.start, args.end)
-    print(mock_panel.get_serial_port)
+    modules = [
+        MockModule(addr, blade_count=args.blades, step_time=args.step_time,
+                   start_time=args.start_time)
+        for addr in range(args.start, args.end+1)
+    ]
+    mock_panel = MockPanel(args.start, args.end, modules=modules,
+                           reply_delay=args.reply_delay)
+    print(mock_panel.get_serial_port())
     mock_panel.run()
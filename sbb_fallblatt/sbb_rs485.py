@@ -3,6 +3,7 @@
 
 
 import sys
+import json
 import time
 import serial
 import struct
@@ -10,6 +11,34 @@ import datetime
 
 from pprint import pprint
 
+from .bus_trace import BusTracer, TracingSerial
+
+
+class BusProfile:
+
+    def __init__( self, break_time=0.05, frame_gap=0, break_per_frame=True, reply_timeout=0.1 ):
+        self.break_time      = break_time
+        self.frame_gap       = frame_gap
+        self.break_per_frame = break_per_frame
+        self.reply_timeout   = reply_timeout
+
+
+    def to_dict( self ):
+        return {
+            "break_time":      self.break_time,
+            "frame_gap":       self.frame_gap,
+            "break_per_frame": self.break_per_frame,
+            "reply_timeout":   self.reply_timeout,
+        }
+
+
+    @classmethod
+    def from_dict( cls, data ):
+        return cls(**data)
+
+
+
+
 
 class PanelControl:
 
@@ -21,10 +50,45 @@ class PanelControl:
     CMD_READ_SERIAL  = b'\xDF'
     CMD_CHANGE_ADDR  = b'\xCE'
 
+    READ_OK          = "ok"
+    READ_TIMEOUT     = "timeout"
+    # a reply arrived, but a late reply of another module may have been
+    # read in its place
+    READ_SUSPECT     = "suspect"
+
+
+    BREAK_CANDIDATES = ( 0.05, 0.02, 0.01, 0.005, 0.002, 0.001 )
+    GAP_CANDIDATES   = ( 0.003, 0.002, 0.001, 0.0005, 0 )
+
 
     def __init__( self, port="/dev/ttyUSB0" ):
         self.port = port
-        self.break_time = 0.05
+        self.profile = BusProfile()
+        # last commanded position per address
+        self.shadow = {}
+        self.tracer = None
+        # running totals, read by the metrics endpoint
+        self.frames_sent   = 0
+        self.read_timeouts = 0
+        # the last reply timed out and may still turn up
+        self._reply_pending = False
+
+
+    @property
+    def break_time( self ):
+        return self.profile.break_time
+
+
+    @break_time.setter
+    def break_time( self, value ):
+        self.profile.break_time = value
+
+
+    def load_profile( self, path ):
+        """Use the bus profile JSON written by bus_profile, returns it"""
+        with open(path) as f:
+            self.profile = BusProfile.from_dict( json.load(f) )
+        return self.profile
 
 
     def connect( self ):
@@ -37,6 +101,25 @@ class PanelControl:
             print("ERROR: Opening serial port failed")
             self.serial = False
             return
+        if self.tracer is not None:
+            self.serial = TracingSerial( self.serial, self.tracer )
+
+
+    def enable_tracing( self, capacity=4096 ):
+        """Record every break, frame and reply, returns the BusTracer"""
+        if self.tracer is None:
+            self.tracer = BusTracer( capacity )
+        serial_port = getattr( self, "serial", False )
+        if serial_port and not isinstance( serial_port, TracingSerial ):
+            self.serial = TracingSerial( serial_port, self.tracer )
+        return self.tracer
+
+
+    def disable_tracing( self ):
+        serial_port = getattr( self, "serial", False )
+        if isinstance( serial_port, TracingSerial ):
+            self.serial = serial_port.port
+        self.tracer = None
 
 
     def pack_msg( self, cmd, addr, value=False ):
@@ -56,9 +139,11 @@ class PanelControl:
         )
 
 
-    def set_break(self):
+    def set_break(self, break_time=None):
+        if break_time is None:
+            break_time = self.break_time
         self.serial.break_condition = True
-        time.sleep(self.break_time)
+        time.sleep(break_time)
         self.serial.break_condition = False
 
 
@@ -67,21 +152,55 @@ class PanelControl:
             return
         self.set_break()
         self.serial.write( msg )
+        self.frames_sent += 1
 
 
-    def send_multiple( self, msgs, sleep_between=False):
+    def send_multiple( self, msgs, sleep_between=False, batched=False ):
+        if batched:
+            self.send_batch( msgs )
+            return
         if not self.serial:
             return
         for msg in msgs:
             self.set_break()
             self.serial.write( msg )
+            self.frames_sent += 1
             if sleep_between:
                 time.sleep(0.003)
 
 
+    def build_batch( self, msgs ):
+        # modules that resync on the 0xFF start byte take the whole batch
+        # after a single break, everything else gets one break per frame
+        if self.profile.break_per_frame:
+            return [ bytes(msg) for msg in msgs ]
+        return [ b"".join(msgs) ]
+
+
+    def send_batch( self, msgs ):
+        if not msgs or not self.serial:
+            return
+        self.send_frames( self.build_batch( msgs ) )
+        self.frames_sent += len(msgs)
+
+
+    def send_frames( self, frames ):
+        if not self.serial:
+            return
+        for i, frame in enumerate(frames):
+            if i and self.profile.frame_gap:
+                time.sleep(self.profile.frame_gap)
+            self.set_break()
+            self.serial.write( frame )
+            # the break must not cut into bytes still sitting in the tx fifo
+            self.serial.flush()
+
+
     def send_and_read( self, msg, ret_len ):
         self.send_msg( msg )
         data = self.serial.read( ret_len )
+        if len(data) < ret_len:
+            self.read_timeouts += 1
         return data
 
 
@@ -106,13 +225,185 @@ class PanelControl:
             return -1
 
 
-    def set_position(self, addr, pos):
-        self.send_msg(
-            self.pack_msg_goto(
-                addr,
-                pos
-            )
+    def read_positions( self, addrs, reply_timeout=None, retries=1 ):
+        if reply_timeout is None:
+            reply_timeout = self.profile.reply_timeout
+        results = { addr: ( self.READ_TIMEOUT, -1 ) for addr in addrs }
+        if not self.serial:
+            return results
+
+        requests = {
+            addr: self.pack_msg( self.CMD_READ_POS, addr )
+            for addr in results
+        }
+        old_timeout = self.serial.timeout
+        try:
+            pending = list(requests)
+            timeout = reply_timeout
+            for _ in range(retries + 1):
+                self.serial.timeout = timeout
+                missing = []
+                for addr in pending:
+                    stray = self._drain_late_replies( timeout )
+                    self.send_msg( requests[addr] )
+                    reply = self.serial.read( 1 )
+                    if len(reply) != 1:
+                        self.read_timeouts += 1
+                        self._reply_pending = True
+                        results[addr] = ( self.READ_TIMEOUT, -1 )
+                        missing.append( addr )
+                    elif stray or self.serial.in_waiting:
+                        # one byte replies cannot tell whose reply this is
+                        results[addr] = ( self.READ_SUSPECT, -1 )
+                        missing.append( addr )
+                    else:
+                        results[addr] = ( self.READ_OK, reply[0] )
+                if not missing:
+                    break
+                pending = missing
+                # give slow modules more time on the retry
+                timeout = 2 * timeout
+        finally:
+            self.serial.timeout = old_timeout
+        return results
+
+
+    def _drain_late_replies( self, reply_timeout ):
+        """Drop stray input, returns whether there was any
+
+        After a timeout the reply may still be on its way, so wait another
+        reply_timeout for it first instead of reading it as the answer to
+        the next request.
+        """
+        if self._reply_pending:
+            time.sleep( reply_timeout )
+            self._reply_pending = False
+        stray = self.serial.in_waiting > 0
+        self.serial.reset_input_buffer()
+        return stray
+
+
+    def set_position(self, addr, pos, force=False):
+        self.send_targets( [ (addr, pos) ], force )
+
+
+    def invalidate_shadow( self, addrs=None ):
+        if addrs is None:
+            self.shadow.clear()
+            return
+        for addr in addrs:
+            self.shadow.pop( addr, None )
+
+
+    def changed_targets( self, targets, force=False ):
+        if force:
+            return list(targets)
+        return [
+            (addr, pos) for addr, pos in targets
+            if self.shadow.get(addr) != pos
+        ]
+
+
+    def prepare_targets( self, targets, force=False ):
+        targets = self.changed_targets( targets, force )
+        frames = self.build_batch(
+            [ self.pack_msg_goto( addr, pos ) for addr, pos in targets ]
         )
+        return targets, frames
+
+
+    def send_prepared( self, prepared ):
+        targets, frames = prepared
+        if not self.serial or not targets:
+            return 0
+        self.send_frames( frames )
+        self.frames_sent += len(targets)
+        self.shadow.update( targets )
+        return len(targets)
+
+
+    def send_targets( self, targets, force=False ):
+        return self.send_prepared( self.prepare_targets( targets, force ) )
+
+
+    def _probe_serial( self, addr, break_time, tries, prefix=b"", gap=None ):
+        msg = self.pack_msg( self.CMD_READ_SERIAL, addr )
+        for _ in range(tries):
+            self.serial.reset_input_buffer()
+            if prefix:
+                self.set_break( break_time )
+                if gap is None:
+                    self.serial.write( prefix + msg )
+                else:
+                    self.serial.write( prefix )
+                    self.serial.flush()
+                    time.sleep( gap )
+                    self.set_break( break_time )
+                    self.serial.write( msg )
+            else:
+                self.set_break( break_time )
+                self.serial.write( msg )
+            if len(self.serial.read( 4 )) != 4:
+                return False
+        return True
+
+
+    def _measure_reply_timeout( self, addr, break_time, tries ):
+        msg = self.pack_msg( self.CMD_READ_SERIAL, addr )
+        latency = 0
+        for _ in range(tries):
+            self.serial.reset_input_buffer()
+            self.set_break( break_time )
+            self.serial.write( msg )
+            self.serial.flush()
+            start = time.monotonic()
+            self.serial.read( 4 )
+            latency = max( latency, time.monotonic() - start )
+        # leave headroom for a busy module, but never wait for ages
+        return min( max( 3 * latency, 0.01 ), 0.5 )
+
+
+    def measure_profile( self, addr, tries=3, timeout=0.5 ):
+        if not self.serial:
+            return None
+        old_timeout = self.serial.timeout
+        self.serial.timeout = timeout
+        try:
+            break_time = None
+            for candidate in sorted(self.BREAK_CANDIDATES, reverse=True):
+                if not self._probe_serial( addr, candidate, tries ):
+                    break
+                break_time = candidate
+            if break_time is None:
+                return None
+            profile = BusProfile(
+                break_time=break_time,
+                frame_gap=max(self.GAP_CANDIDATES),
+                break_per_frame=True,
+                reply_timeout=self._measure_reply_timeout( addr, break_time, tries )
+            )
+
+            # a GOTO to the current position is a no-op without a reply,
+            # so it can lead the probe frame without moving any blade
+            self.serial.reset_input_buffer()
+            pos = self.get_position( addr )
+            if pos < 0:
+                return profile
+            noop = self.pack_msg_goto( addr, pos )
+
+            if self._probe_serial( addr, break_time, tries, prefix=noop ):
+                profile.break_per_frame = False
+                profile.frame_gap = 0
+                return profile
+
+            for candidate in sorted(self.GAP_CANDIDATES, reverse=True):
+                if not self._probe_serial( addr, break_time, tries, prefix=noop, gap=candidate ):
+                    break
+                profile.frame_gap = candidate
+            return profile
+        finally:
+            self.serial.timeout = old_timeout
+            self.serial.reset_input_buffer()
 
 
     def fill_list( self, lst, n, fill):
@@ -151,15 +442,15 @@ class PanelAlphanumControl( PanelControl ):
 
 
     def get_text(self):
-        pos = []
-        for addr in self.addrs:
-            pos.append(
-                self.get_position( addr )
-            )
-            self.serial.flushInput()
+        results = self.read_positions( self.addrs )
+        pos = [ results[addr][1] for addr in self.addrs ]
         return self.pos_to_str(pos)
 
 
+    def pos_to_targets(self, pos):
+        return list(zip(self.addrs, pos))
+
+
     def pos_to_msg(self, pos):
         msg  = []
         addr_pos = 0
@@ -174,17 +465,16 @@ class PanelAlphanumControl( PanelControl ):
         return msg
 
 
-    def set_zero(self):
+    def set_zero(self, force=False):
         pos = self.fill_list(
             [],
             self.length,
             self.POS_BLANK
         )
-        msg = self.pos_to_msg(pos)
-        self.send_multiple(msg)
+        self.send_targets(self.pos_to_targets(pos), force)
 
 
-    def set_text(self, text, fill=True):
+    def set_text(self, text, fill=True, force=False):
 
         pos  = self.str_to_pos(text)
         pos = pos[:self.length]
@@ -195,8 +485,7 @@ class PanelAlphanumControl( PanelControl ):
                 self.POS_BLANK
             )
 
-        msg = self.pos_to_msg(pos)
-        self.send_multiple(msg)
+        self.send_targets(self.pos_to_targets(pos), force)
 
 
 
@@ -219,7 +508,7 @@ class PanelClockControl( PanelControl ):
 
 
     def calc_min_pos_rev( self, pos ):
-        if pos>30:
+        if pos>=30:
             ret = pos-30
         else:
             ret = pos+31
@@ -241,35 +530,64 @@ class PanelClockControl( PanelControl ):
         return hour,minute
 
 
-    def set_zero( self ):
-        msg = [
-            self.build_set_hour_msg( 0 ),
-            self.build_set_minute_msg( 0 )
+    def set_zero( self, force=False ):
+        targets = [
+            ( self.addr_hour, 0 ),
+            ( self.addr_min, self.calc_min_pos( 0 ) )
         ]
-        self.send_multiple( msg )
+        self.send_targets( targets, force )
+
 
+    def build_set_hour_msg( self, hour ):
+        return self.pack_msg_goto(
+            self.addr_hour,
+            hour
+        )
 
-    def set_minute( self, minute ):
+
+    def build_set_minute_msg( self, minute ):
+        return self.pack_msg_goto(
+            self.addr_min,
+            self.calc_min_pos( minute )
+        )
+
+
+    def set_minute( self, minute, force=False ):
         if minute>60:
             return
         self.set_position(
             self.addr_min,
-            self.calc_min_pos( minute )
+            self.calc_min_pos( minute ),
+            force
         )
 
 
-    def set_hour( self, hour ):
+    def set_hour( self, hour, force=False ):
         if hour>23:
             return
         self.set_position(
             self.addr_hour,
-            hour
+            hour,
+            force
         )
 
 
-    def set_time( self, hour, minute ):
-        self.set_hour(hour)
-        self.set_minute(minute)
+    def time_targets( self, hour, minute ):
+        targets = []
+        if hour<=23:
+            targets.append( ( self.addr_hour, hour ) )
+        if minute<=60:
+            targets.append( ( self.addr_min, self.calc_min_pos( minute ) ) )
+        return targets
+
+
+    def prepare_time( self, hour, minute, force=False ):
+        # both frames in one buffer, the hour only if it changes
+        return self.prepare_targets( self.time_targets( hour, minute ), force )
+
+
+    def set_time( self, hour, minute, force=False ):
+        return self.send_prepared( self.prepare_time( hour, minute, force ) )
 
 
     def set_time_now( self ):
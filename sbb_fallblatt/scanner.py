@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Enumerate the modules on one or more SBB RS485 buses"""
+
+import time
+import concurrent.futures
+
+from . import sbb_rs485
+
+
+class BusScanner:
+    """Find every module on a bus by asking each address for its serial number.
+
+    Silent addresses are given up after a short reply timeout that adapts
+    to the round trip of the modules that did answer. A module slower than
+    that timeout answers while the next address is probed, so a fast reply
+    is not trusted: every hit is probed again with the long timeout before
+    its serial is kept, together with suspicious addresses (partial or late
+    replies). A hit that turns out silent or with another serial was the
+    late reply of an address probed shortly before it, so every address
+    probed up to max_timeout earlier is probed again too.
+    """
+
+    ADDR_ALL = range(0, 256)
+
+    def __init__(self, panel, timeout=0.03, max_timeout=0.5, retries=2):
+        self.panel = panel
+        self.timeout = timeout
+        self.min_timeout = timeout
+        self.max_timeout = max_timeout
+        self.retries = retries
+
+    def _adapt(self, latency):
+        self.timeout = min(max(4 * latency, self.min_timeout), self.max_timeout)
+
+    def _slow_down(self):
+        self.timeout = min(2 * self.timeout, self.max_timeout)
+
+    def probe(self, addr, timeout):
+        """Return (serial, suspicious, late) for a single address
+
+        late is set if bytes of an earlier request were still arriving, the
+        address probed before answered after its timeout.
+        """
+        ser = self.panel.serial
+        msg = self.panel.pack_msg(self.panel.CMD_READ_SERIAL, addr)
+        late = ser.in_waiting > 0
+        ser.reset_input_buffer()
+        ser.timeout = timeout
+        self.panel.send_msg(msg)
+        ser.flush()
+        start = time.monotonic()
+        data = ser.read(4)
+        latency = time.monotonic() - start
+        if len(data) == 4 and not ser.in_waiting:
+            if not late:
+                self._adapt(latency)
+            return bytes(data), False, late
+        # a short read or trailing bytes mean someone is there but was cut off
+        return None, len(data) > 0 or ser.in_waiting > 0, late
+
+    def scan(self, addrs=ADDR_ALL, progress=None):
+        """Return {addr: serial} for every responding address"""
+        found = {}
+        if not self.panel.serial:
+            return found
+        old_timeout = self.panel.serial.timeout
+        # serials read with the short timeout, not attributed yet
+        hits = {}
+        suspicious = []
+        # addresses probed up to max_timeout before each one, any of them
+        # may have answered late
+        before = {}
+        probed = []
+        try:
+            for addr in addrs:
+                if progress:
+                    progress(addr)
+                now = time.monotonic()
+                probed = [ (t, a) for t, a in probed if now - t <= self.max_timeout ]
+                before[addr] = [ a for _, a in probed ]
+                probed.append( (now, addr) )
+                serial, suspect, late = self.probe(addr, self.timeout)
+                if late:
+                    self._slow_down()
+                    suspicious.extend(before[addr])
+                if serial is not None:
+                    hits[addr] = serial
+                elif suspect:
+                    suspicious.append(addr)
+
+            retry = list(hits) + suspicious
+            for _ in range(self.retries):
+                if not retry:
+                    break
+                suspicious = []
+                for addr in dict.fromkeys(retry):
+                    if addr in found:
+                        continue
+                    serial, suspect, _ = self.probe(addr, self.max_timeout)
+                    if serial is not None:
+                        found[addr] = serial
+                    elif suspect:
+                        suspicious.append(addr)
+                    if addr in hits and hits[addr] != serial:
+                        # the first reply belonged to an earlier address
+                        suspicious.extend(
+                            a for a in before[addr] if a not in found
+                        )
+                retry = suspicious
+        finally:
+            self.panel.serial.timeout = old_timeout
+            self.panel.serial.reset_input_buffer()
+        return found
+
+
+def scan_port(port, addrs=BusScanner.ADDR_ALL, profile=None, **kwargs):
+    """Open port, scan it and close it again"""
+    panel = sbb_rs485.PanelControl(port)
+    if profile is not None:
+        panel.profile = profile
+    panel.connect()
+    if not panel.serial:
+        return {}
+    try:
+        return BusScanner(panel, **kwargs).scan(addrs)
+    finally:
+        panel.serial.close()
+
+
+def scan_ports(ports, addrs=BusScanner.ADDR_ALL, profile=None, **kwargs):
+    """Scan several buses concurrently, return {port: {addr: serial}}"""
+    ports = list(ports)
+    if not ports:
+        return {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(ports)) as pool:
+        futures = {
+            port: pool.submit(scan_port, port, addrs, profile, **kwargs)
+            for port in ports
+        }
+        return {port: future.result() for port, future in futures.items()}
@@ -39,10 +39,17 @@ def main():
         type=str,
         required=True
     )
+    parser.add_argument(
+        '--profile',
+        help="Bus profile JSON written by bus_profile",
+        type=str
+    )
     args = parser.parse_args()
 
     addrs = list(range(args.start,args.end+1))
     cc = sbb_rs485.PanelAlphanumControl(addresses=addrs, port=args.port )
+    if args.profile:
+        cc.load_profile(args.profile)
     cc.connect()
     cc.set_text(args.text)
     cc.serial.close()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from . import sbb_rs485
+import sys
+import json
+import argparse
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Poll modules and trace the bus traffic of an SBB panel")
+    parser.add_argument(
+        '--port',
+        '-p',
+        help="Serial port",
+        type=str,
+        required=True
+    )
+    parser.add_argument(
+        '--addr',
+        '-a',
+        help="Address of a module to poll, can be given more than once",
+        type=int,
+        action='append',
+        required=True
+    )
+    parser.add_argument(
+        '--count',
+        '-n',
+        help="Position reads per module",
+        type=int,
+        default=100
+    )
+    parser.add_argument(
+        '--profile',
+        help="Bus profile JSON written by bus_profile",
+        type=str
+    )
+    parser.add_argument(
+        '--jsonl',
+        help="Write the trace as JSON lines to this file",
+        type=str
+    )
+    parser.add_argument(
+        '--pcap',
+        help="Write the trace as pcap to this file",
+        type=str
+    )
+    args = parser.parse_args()
+
+    cc = sbb_rs485.PanelControl(args.port)
+    if args.profile:
+        cc.load_profile(args.profile)
+    cc.connect()
+    if not cc.serial:
+        sys.exit(1)
+    tracer = cc.enable_tracing(capacity=4 * args.count * len(args.addr) + 16)
+    for _ in range(args.count):
+        cc.read_positions(args.addr, retries=0)
+    cc.serial.close()
+
+    print(json.dumps(tracer.stats(by_addr=True), indent=4))
+    if args.jsonl:
+        with open(args.jsonl, "w") as f:
+            tracer.dump_jsonl(f)
+    if args.pcap:
+        with open(args.pcap, "wb") as f:
+            tracer.dump_pcap(f)
+    sys.exit(0)
+
+
+
+
+
+if __name__ == '__main__':
+    main()
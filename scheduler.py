@@ -0,0 +1,112 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(order=True)
+class Timer:
+    deadline: float
+    seq: int
+    callback: Callable[..., Any] = field(compare=False)
+    args: tuple = field(compare=False, default=())
+    cancelled: bool = field(compare=False, default=False)
+
+
+class Scheduler:
+    """Run timers and posted events on a single thread.
+
+    The thread sleeps on one condition until the earliest timer is due or
+    another thread posts an event, so nothing polls. Callbacks always run on
+    the scheduler thread, one at a time.
+    """
+
+    def __init__(self, time_fn: Callable[[], float] = time.monotonic) -> None:
+        self._time_fn = time_fn
+        self._condition = threading.Condition()
+        self._timers: list[Timer] = []
+        self._events: deque[tuple[Callable[..., Any], tuple]] = deque()
+        self._seq = itertools.count()
+        self._stopped: bool = False
+
+    def time(self) -> float:
+        return self._time_fn()
+
+    def call_at(self, deadline: float, callback: Callable[..., Any], *args) -> Timer:
+        """Run callback(*args) once time() reaches deadline."""
+        timer = Timer(deadline, next(self._seq), callback, args)
+        with self._condition:
+            heapq.heappush(self._timers, timer)
+            if self._timers[0] is timer:
+                self._condition.notify()
+        return timer
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args) -> Timer:
+        """Run callback(*args) after delay seconds."""
+        return self.call_at(self.time() + delay, callback, *args)
+
+    def post(self, callback: Callable[..., Any], *args) -> None:
+        """Run callback(*args) as soon as possible, safe to call from any thread."""
+        with self._condition:
+            self._events.append((callback, args))
+            self._condition.notify()
+
+    def cancel(self, timer: Timer | None) -> None:
+        """Cancel a timer, a timer that already ran or None is ignored."""
+        if timer is not None:
+            timer.cancelled = True
+
+    def next_deadline(self) -> float | None:
+        with self._condition:
+            self._drop_cancelled()
+            return self._timers[0].deadline if self._timers else None
+
+    def _drop_cancelled(self) -> None:
+        while self._timers and self._timers[0].cancelled:
+            heapq.heappop(self._timers)
+
+    def _pop_due(self) -> tuple[Callable[..., Any], tuple] | None:
+        with self._condition:
+            if self._events:
+                return self._events.popleft()
+            self._drop_cancelled()
+            if self._timers and self._timers[0].deadline <= self.time():
+                timer = heapq.heappop(self._timers)
+                timer.cancelled = True  # Ran, cancelling it is a no-op now
+                return timer.callback, timer.args
+        return None
+
+    def run_pending(self) -> None:
+        """Run all posted events and due timers, then return."""
+        while not self._stopped:
+            due = self._pop_due()
+            if due is None:
+                return
+            callback, args = due
+            callback(*args)
+
+    def run(self) -> None:
+        """Run until stop() is called."""
+        while True:
+            self.run_pending()
+            with self._condition:
+                if self._stopped:
+                    return
+                if self._events:
+                    continue
+                self._drop_cancelled()
+                timeout = None
+                if self._timers:
+                    timeout = self._timers[0].deadline - self.time()
+                    if timeout <= 0:
+                        continue
+                self._condition.wait(timeout)
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
@@ -0,0 +1,84 @@
+from collections.abc import Callable
+
+from scheduler import Scheduler, Timer
+
+
+class ShutdownSequence:
+    """Count down to power off while the shutdown switch is held.
+
+    The sequence shows 0:50 for ``grace_time`` seconds, then advances the
+    minute blade once per second up to 0:59 and powers off at 0:00.
+    Releasing the switch at any point before that cancels it immediately.
+    If powering off returns, the sequence is idle again and the next press
+    starts over.
+    All transitions run on the scheduler thread, so no thread ever sleeps
+    and a fake scheduler clock can drive it in tests.
+    """
+
+    IDLE = "idle"
+    ARMED = "armed"
+    COUNTING = "counting"
+    SHUTTING_DOWN = "shutting_down"
+
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        show_time: Callable[[int, int], None],
+        power_off: Callable[[], None],
+        timeout: int = 10,
+        grace_time: float = 3.0,
+    ) -> None:
+        self._scheduler = scheduler
+        self._show_time = show_time
+        self._power_off = power_off
+        self._timeout: int = timeout
+        self._grace_time: float = grace_time
+        self._state: str = self.IDLE
+        self._timer: Timer | None = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def timeout(self) -> int:
+        return self._timeout
+
+    def press(self) -> None:
+        """Start the sequence, ignored while it is already running."""
+        if self._state != self.IDLE:
+            return
+        self._state = self.ARMED
+        self._show_time(0, 60 - self._timeout)
+        self._timer = self._scheduler.call_later(
+            self._grace_time, self._count_down, self._timeout
+        )
+
+    def release(self) -> bool:
+        """Cancel the sequence, returns whether it was running."""
+        if self._state not in (self.ARMED, self.COUNTING):
+            return False
+        self._scheduler.cancel(self._timer)
+        self._timer = None
+        self._state = self.IDLE
+        print("[Shutdown Sequence] Button released, shutdown cancelled.")
+        return True
+
+    def _count_down(self, remaining: int) -> None:
+        if remaining == 0:
+            print("[Shutdown Sequence] Button still pressed, shutting down!")
+            self._state = self.SHUTTING_DOWN
+            self._timer = None
+            self._show_time(0, 0)
+            try:
+                self._power_off()
+            finally:
+                # Only returns if the shutdown failed, the next press tries
+                # again
+                self._state = self.IDLE
+            return
+
+        print(f"[Shutdown Sequence] Shutting down in {remaining} seconds...")
+        self._state = self.COUNTING
+        self._show_time(0, 60 - remaining)
+        self._timer = self._scheduler.call_later(1, self._count_down, remaining - 1)
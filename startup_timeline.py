@@ -0,0 +1,45 @@
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+
+class StartupTimeline:
+    """Record when each startup phase ran and how long it took.
+
+    Phases may run on different threads and overlap, the report lists them
+    by start time relative to the creation of the timeline.
+    """
+
+    def __init__(self, time_fn: Callable[[], float] = time.monotonic) -> None:
+        self._time_fn = time_fn
+        self._origin: float = time_fn()
+        self._lock = threading.Lock()
+        self._phases: list[tuple[str, float, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = self._time_fn()
+        try:
+            yield
+        finally:
+            self._record(name, start, self._time_fn())
+
+    def mark(self, name: str) -> float:
+        """Record a milestone, returns the seconds since the timeline started."""
+        now = self._time_fn()
+        self._record(name, now, now)
+        return now - self._origin
+
+    def _record(self, name: str, start: float, end: float) -> None:
+        with self._lock:
+            self._phases.append((name, start - self._origin, end - self._origin))
+
+    def report(self) -> str:
+        with self._lock:
+            phases = sorted(self._phases, key=lambda p: p[1])
+        lines = []
+        for name, start, end in phases:
+            took = f"took {end - start:6.2f} s" if end > start else ""
+            lines.append(f"{name:>20} | at {start:6.2f} s {took}".rstrip())
+        return "\n".join(lines)
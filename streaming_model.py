@@ -0,0 +1,215 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as ort
+from livekit.wakeword.models.feature_extractor import (
+    MelSpectrogramFrontend,
+    SpeechEmbedding,
+)
+from livekit.wakeword.resources import get_embedding_model_path, get_mel_model_path
+from livekit.wakeword.session import session_options
+
+BLOCK_SIZE = 1280  # Samples per block, yields 8 mel frames and 1 embedding
+MEL_CONTEXT = 480  # Samples of the previous block each mel window overlaps
+MEL_BINS = 32
+EMBEDDING_WINDOW = 76  # Mel frames per embedding
+EMBEDDING_SIZE = 96
+EMBEDDING_COUNT = 16  # Classifier input length
+# The newest mel frame is not part of an embedding yet, keep one extra
+MEL_HISTORY = EMBEDDING_WINDOW + 1
+
+# Maps a model path and session options to the file and options to load
+SessionPreparer = Callable[
+    [Path, ort.SessionOptions | None], tuple[Path, ort.SessionOptions | None]
+]
+
+
+class StreamingWakeWordModel:
+    """Wake word model that only computes features for new audio.
+
+    ``livekit.wakeword.WakeWordModel.predict`` recomputes the mel spectrogram
+    and all 16 speech embeddings over the full 2 s window on every call. This
+    model keeps the mel frames and embeddings of audio it has already seen,
+    so every 1280 sample block costs one small mel call and one embedding.
+    Scoring only runs the classifier heads.
+    """
+
+    def __init__(
+        self,
+        models: list[str | Path],
+        sess_options: ort.SessionOptions | None = None,
+        prepare_session: SessionPreparer | None = None,
+    ) -> None:
+        """
+        Args:
+            models: Paths of the wake word classifier heads.
+            sess_options: Options for every ONNX session.
+            prepare_session: Optional hook that decides which file to load
+                for each model and with which options, e.g. to load a graph
+                that was optimized and saved by an earlier run.
+        """
+        self._prepare_session = prepare_session or (lambda path, opts: (path, opts))
+        mel_path, mel_options = self._prepare_session(
+            Path(get_mel_model_path()), sess_options
+        )
+        self._mel = MelSpectrogramFrontend(onnx_path=mel_path, sess_options=mel_options)
+        embedding_path, embedding_options = self._prepare_session(
+            Path(get_embedding_model_path()), sess_options
+        )
+        self._embedding = SpeechEmbedding(
+            onnx_path=embedding_path, sess_options=embedding_options
+        )
+        # name -> (onnx_session, input_name)
+        self._classifiers: dict[str, tuple[ort.InferenceSession, str]] = {}
+        for model_path in models:
+            self.load_model(model_path, sess_options=sess_options)
+
+        self._block: np.ndarray = np.zeros(BLOCK_SIZE, dtype=np.float32)
+        self._mel_input: np.ndarray = np.zeros(
+            MEL_CONTEXT + BLOCK_SIZE, dtype=np.float32
+        )
+        self._mel_frames: np.ndarray = np.zeros(
+            (MEL_HISTORY, MEL_BINS), dtype=np.float32
+        )
+        self._embeddings: np.ndarray = np.zeros(
+            (1, EMBEDDING_COUNT, EMBEDDING_SIZE), dtype=np.float32
+        )
+        self.reset()
+
+    def load_model(
+        self,
+        model_path: str | Path,
+        model_name: str | None = None,
+        sess_options: ort.SessionOptions | None = None,
+    ) -> None:
+        """Load a wake word classifier head."""
+        model_path = Path(model_path)
+        if not model_path.exists():
+            raise FileNotFoundError(f"Wake word model not found: {model_path}")
+
+        name = model_name or model_path.stem
+        load_path, sess_options = self._prepare_session(model_path, sess_options)
+        session = ort.InferenceSession(
+            str(load_path),
+            providers=["CPUExecutionProvider"],
+            sess_options=session_options(sess_options),
+        )
+        self._classifiers[name] = (session, session.get_inputs()[0].name)
+
+    @property
+    def model_names(self) -> list[str]:
+        return list(self._classifiers)
+
+    def reset(self) -> None:
+        """Forget all audio seen so far."""
+        self._block_fill: int = 0
+        self._has_context: bool = False
+        self._mel_count: int = 0
+        self._embedding_count: int = 0
+
+    @property
+    def ready(self) -> bool:
+        """Whether enough audio has been seen to score."""
+        return self._embedding_count >= EMBEDDING_COUNT
+
+    def update(self, audio: np.ndarray) -> int:
+        """Feed new audio, returns the number of new embeddings.
+
+        Args:
+            audio: Samples at 16 kHz, int16 or float32. Partial blocks are
+                kept until the rest of the block arrives.
+        """
+        scale = 1.0 / 32768.0 if audio.dtype == np.int16 else 1.0
+        new_embeddings = 0
+        pos = 0
+        while pos < len(audio):
+            take = min(BLOCK_SIZE - self._block_fill, len(audio) - pos)
+            block = self._block[self._block_fill : self._block_fill + take]
+            np.multiply(audio[pos : pos + take], scale, out=block, casting="unsafe")
+            self._block_fill += take
+            pos += take
+            if self._block_fill == BLOCK_SIZE:
+                self._block_fill = 0
+                new_embeddings += self._process_block()
+        return new_embeddings
+
+    def _process_block(self) -> int:
+        if self._has_context:
+            # Keep the tail of the previous block as context for the mel windows
+            self._mel_input[:MEL_CONTEXT] = self._mel_input[-MEL_CONTEXT:]
+            self._mel_input[MEL_CONTEXT:] = self._block
+            mel_input = self._mel_input
+        else:
+            self._mel_input[MEL_CONTEXT:] = self._block
+            mel_input = self._mel_input[MEL_CONTEXT:]
+            self._has_context = True
+
+        frames = self._mel(mel_input)[0]
+        n = len(frames)
+        self._mel_frames[:-n] = self._mel_frames[n:]
+        self._mel_frames[-n:] = frames
+        self._mel_count += n
+        if self._mel_count < MEL_HISTORY:
+            return 0
+
+        embedding = self._embedding(self._mel_frames[np.newaxis, :-1])
+        self._push_embeddings(embedding)
+        return 1
+
+    def _push_embeddings(self, embeddings: np.ndarray) -> None:
+        n = min(len(embeddings), EMBEDDING_COUNT)
+        emb = self._embeddings[0]
+        emb[:-n] = emb[n:]
+        emb[-n:] = embeddings[-n:]
+        self._embedding_count += n
+
+    def prime(self, window: np.ndarray) -> None:
+        """Reset and rebuild the features from a full window in one pass.
+
+        Gives the same features as ``WakeWordModel.predict`` for a 2 s
+        window, batching all embeddings into a single call. Afterwards
+        update() continues incrementally from the end of the window.
+        """
+        self.reset()
+        usable = len(window) - len(window) % BLOCK_SIZE
+        if usable == 0:
+            self.update(window)
+            return
+        window = window[len(window) - usable :]
+        if window.dtype == np.int16:
+            audio = window.astype(np.float32) / 32768.0
+        else:
+            audio = window.astype(np.float32, copy=False)
+
+        mel = self._mel(audio)[0]
+        # Drop the newest frame, it is not part of an embedding yet
+        last = len(mel) - 1
+        starts = range(last - EMBEDDING_WINDOW, -1, -8)[:EMBEDDING_COUNT][::-1]
+        if starts:
+            windows = np.stack([mel[s : s + EMBEDDING_WINDOW] for s in starts])
+            self._push_embeddings(self._embedding(windows))
+
+        n = min(len(mel), MEL_HISTORY)
+        self._mel_frames[-n:] = mel[-n:]
+        self._mel_count = len(mel)
+        self._mel_input[-MEL_CONTEXT:] = audio[-MEL_CONTEXT:]
+        self._has_context = True
+
+    def scores(self, names: list[str] | None = None) -> dict[str, float]:
+        """Run the classifier heads (all by default) on the newest embeddings."""
+        if names is None:
+            names = self.model_names
+        if not self.ready:
+            return {name: 0.0 for name in names}
+        predictions = {}
+        for name in names:
+            session, input_name = self._classifiers[name]
+            outputs = session.run(None, {input_name: self._embeddings})
+            predictions[name] = float(outputs[0][0, 0])
+        return predictions
+
+    def predict(self, window: np.ndarray) -> dict[str, float]:
+        """Stateless scoring of a full window, like ``WakeWordModel.predict``."""
+        self.prime(window)
+        return self.scores()
@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+
+from audio_level import level_dbfs
+
+
+class VoiceActivityGate:
+    """Cheap energy gate that decides whether a chunk may contain speech.
+
+    The level of every chunk is compared against a noise floor that follows
+    quiet chunks quickly and loud chunks slowly. Chunks loud enough to open
+    the gate still pull the floor up, slowest of all, so a steady fan or hum
+    becomes the floor and the gate closes again. Once a chunk is loud enough
+    the gate stays open for ``hangover_chunks`` chunks so the tail of a word
+    is still scored.
+    """
+
+    def __init__(
+        self,
+        threshold_db: float = 9.0,
+        min_dbfs: float = -55.0,
+        hangover_chunks: int = 12,
+    ) -> None:
+        self._threshold_db: float = threshold_db
+        self._min_dbfs: float = min_dbfs
+        self._hangover_chunks: int = hangover_chunks
+        self._noise_floor_dbfs: float = min_dbfs
+        self._hangover: int = 0
+        self._scratch: np.ndarray = np.empty(0, dtype=np.float32)
+
+    @property
+    def noise_floor_dbfs(self) -> float:
+        return self._noise_floor_dbfs
+
+    def reset(self) -> None:
+        self._hangover = 0
+
+    def level_dbfs(self, audio: np.ndarray) -> float:
+        """RMS level of int16 audio in dB relative to full scale."""
+        if len(self._scratch) < len(audio):
+            self._scratch = np.empty(len(audio), dtype=np.float32)
+        return level_dbfs(audio, self._scratch)
+
+    def is_active(self, audio: np.ndarray) -> bool:
+        """Feed one chunk, returns whether it should be scored."""
+        level = self.level_dbfs(audio)
+        threshold = max(self._noise_floor_dbfs + self._threshold_db, self._min_dbfs)
+        speech = level > threshold
+
+        if level > -math.inf:
+            # Drop to quieter rooms fast, rise to louder ones slowly. A word
+            # only lasts a few chunks and barely moves the floor, a steady
+            # noise takes it over in about 20 seconds of 80 ms chunks
+            if level < self._noise_floor_dbfs:
+                rate = 0.2
+            elif speech:
+                rate = 0.002
+            else:
+                rate = 0.01
+            self._noise_floor_dbfs += rate * (level - self._noise_floor_dbfs)
+
+        if speech:
+            self._hangover = self._hangover_chunks
+            return True
+        if self._hangover > 0:
+            self._hangover -= 1
+            return True
+        return False
@@ -1,27 +1,143 @@
-import queue
 import threading
 import time
+import wave
 from dataclasses import dataclass
+from pathlib import Path
 
 import miniaudio
 import numpy as np
-from livekit.wakeword import WakeWordModel
+
+from audio_buffer import SampleRing, SlidingWindow
+from audio_gain import GainStage
+from inference_worker import InferenceWorker
+from metrics import MetricsRegistry
+from model_cache import default_cache
+from streaming_model import StreamingWakeWordModel
+from voice_activity import VoiceActivityGate
+
+WAKE_WORD_MODEL_PATHS: list[str] = [
+    # "resources/models/alexa_v0.1.onnx",
+    # "resources/models/custom/hey_clock.onnx",
+    # "resources/models/custom/tic_toc.onnx",
+    # "resources/models/custom/tick_tock_v3.onnx",
+    # "resources/models/custom/hey_livekit.onnx",
+    # "resources/models/custom/hey_clock_v1.onnx",
+    "resources/models/custom/hey_clock_small_v1.onnx",
+    # "resources/models/custom/hey_clock_tiny_v1.onnx",
+]
+
+
+def load_wake_word_model(
+    model_paths: list[str] | None = None,
+) -> StreamingWakeWordModel:
+    """Load the wake word models, this is the slow part of creating a detector.
+
+    Models come from the process-wide cache, so only the first call per set of
+    paths builds and warms up the ONNX sessions.
+    """
+    return default_cache().get(model_paths or WAKE_WORD_MODEL_PATHS)
+
+
+def load_wav(file_path: str, sample_rate: int = 16000) -> np.ndarray:
+    """Load a WAV file as mono int16 samples at the model sample rate."""
+    with wave.open(file_path, "rb") as wf:
+        n_channels = wf.getnchannels()
+        orig_sample_rate = wf.getframerate()
+        n_frames = wf.getnframes()
+        raw_data = wf.readframes(n_frames)
+
+    # Convert to mono 16kHz int16 using miniaudio
+    converted = miniaudio.convert_frames(
+        from_fmt=miniaudio.SampleFormat.SIGNED16,
+        from_numchannels=n_channels,
+        from_samplerate=orig_sample_rate,
+        sourcedata=raw_data,
+        to_fmt=miniaudio.SampleFormat.SIGNED16,
+        to_numchannels=1,
+        to_samplerate=sample_rate,
+    )
+    return np.frombuffer(converted, dtype=np.int16)
+
+
+class AudioDeviceError(ValueError):
+    """The input device cannot be found or opened, it may appear later."""
 
 
 class WakeWordDetector:
+    @dataclass
+    class ModelConfig:
+        path: str
+        threshold: float | None = None  # Config.detection_threshold if None
+        debounce: float | None = None  # Config.debounce if None
+
+        @property
+        def name(self) -> str:
+            return Path(self.path).stem
+
     @dataclass
     class Config:
         input_device_name: str | None = None
-        audio_gain: float = 1.0
+        audio_gain: float = 1.0  # Fixed gain, or the starting gain with AGC
+        # Automatic gain control, adapts the gain to bring speech to the
+        # target level instead of boosting the input device by hand
+        agc_enabled: bool = False
+        agc_target_dbfs: float = -20.0
+        agc_max_gain: float = 10.0
         detection_threshold: float = 0.3
         debounce: float = 2.0
-        # With a smaller stride the CPU on the Raspberry Pi is too slow
-        inference_stride: int = 8
+        # Features are computed incrementally for every chunk, the stride only
+        # decides how often the classifier heads are run on them
+        inference_stride: int = 2
+        # Skip inference while the room is silent and run it on every chunk
+        # while there is speech-like energy
+        vad_enabled: bool = True
+        vad_threshold_db: float = 9.0  # Above the tracked noise floor
+        vad_min_dbfs: float = -55.0
+        vad_hangover: float = 1.0  # Seconds to keep scoring after speech
+        # Seconds of audio the capture callback can queue ahead of detection,
+        # more is dropped and counted as an overrun
+        ingest_buffer: float = 1.0
+        # Seconds from a chunk arriving to its scores, slower windows are
+        # counted as deadline misses. Windows that wait while the model is
+        # busy are dropped, the next one catches up.
+        inference_deadline: float = 0.25
+        # All models share one feature extraction front end, each extra model
+        # only adds its classifier head. None runs WAKE_WORD_MODEL_PATHS.
+        models: list["WakeWordDetector.ModelConfig"] | None = None
         debug: bool = False
 
-    def __init__(self, config: Config | None = None) -> None:
+        def model_configs(self) -> list["WakeWordDetector.ModelConfig"]:
+            if self.models is not None:
+                return self.models
+            return [
+                WakeWordDetector.ModelConfig(path) for path in WAKE_WORD_MODEL_PATHS
+            ]
+
+        def model_paths(self) -> list[str]:
+            return [model.path for model in self.model_configs()]
+
+    def __init__(
+        self,
+        config: Config | None = None,
+        model: StreamingWakeWordModel | None = None,
+        metrics: MetricsRegistry | None = None,
+    ) -> None:
+        """Open the audio device and set up detection.
+
+        Args:
+            config: Detector configuration, the defaults are used if None.
+            model: A model loaded with load_wake_word_model() for the model
+                paths of the config. Pass it when retrying after the audio
+                device was not available, so the model is only loaded once.
+            metrics: Registry to record the inference and detection latency
+                in.
+
+        Raises:
+            ValueError: If the configuration or the model is invalid.
+            AudioDeviceError: If the input device cannot be found or opened.
+        """
         self._config = config or WakeWordDetector.Config()
-        self._max_gain: float = 10.0
+        self._max_gain: float = self._config.agc_max_gain
 
         # Validate configuration
         if self._config.audio_gain < 0:
@@ -38,25 +154,50 @@ class WakeWordDetector:
             raise ValueError("detection_threshold must be between 0 and 1")
         if self._config.inference_stride < 1:
             raise ValueError("inference_stride must be >= 1")
+        if self._config.inference_deadline <= 0:
+            raise ValueError("inference_deadline must be positive")
+        if not 0 < self._max_gain <= 16:
+            raise ValueError("agc_max_gain must be between 0 and 16")
 
         self._detection_threshold: float = self._config.detection_threshold
 
-        self._wake_word_model_paths: list[str] = [
-            # "resources/models/alexa_v0.1.onnx",
-            # "resources/models/custom/hey_clock.onnx",
-            # "resources/models/custom/tic_toc.onnx",
-            # "resources/models/custom/tick_tock_v3.onnx",
-            # "resources/models/custom/hey_livekit.onnx",
-            # "resources/models/custom/hey_clock_v1.onnx",
-            "resources/models/custom/hey_clock_small_v1.onnx",
-            # "resources/models/custom/hey_clock_tiny_v1.onnx",
-        ]
+        model_configs = self._config.model_configs()
+        if not model_configs:
+            raise ValueError("at least one wake word model is required")
+        # Per model name
+        self._thresholds: dict[str, float] = {}
+        self._debounces: dict[str, float] = {}
+        self._last_detection_times: dict[str, float] = {}
+        for model_config in model_configs:
+            threshold = model_config.threshold
+            if threshold is None:
+                threshold = self._detection_threshold
+            if threshold <= 0 or threshold > 1:
+                raise ValueError(
+                    f"threshold of {model_config.name} must be between 0 and 1"
+                )
+            debounce = model_config.debounce
+            if debounce is None:
+                debounce = self._config.debounce
+            self._thresholds[model_config.name] = threshold
+            self._debounces[model_config.name] = debounce
+            self._last_detection_times[model_config.name] = 0.0
+        self._model_names: list[str] = list(self._thresholds)
+        self._last_wake_word: str | None = None
 
         self._model_sample_rate: int = 16000  # Fixed by wake word model
         self._sample_format = miniaudio.SampleFormat.SIGNED16
         self._channel_count: int = 1
         self._sample_count_per_chunk: int = 1280
 
+        # Check the models before the audio device is opened, a bad model
+        # list must not look like a missing device
+        self._model = model or load_wake_word_model(self._config.model_paths())
+        self._model.reset()
+        missing = set(self._model_names) - set(self._model.model_names)
+        if missing:
+            raise ValueError(f"Model is missing wake words: {', '.join(missing)}")
+
         # Get microphone stream
         self._devices = miniaudio.Devices()
         self._captures = self._devices.get_captures()
@@ -70,26 +211,75 @@ class WakeWordDetector:
 
         print(f"Recording at {self._model_sample_rate} Hz")
 
-        self._audio_queue: queue.Queue[bytes] = queue.Queue()
+        # Filled by the capture callback, drained by listen_for_wake_word()
+        self._audio_ring = SampleRing(
+            max(
+                int(self._config.ingest_buffer * self._model_sample_rate),
+                self._sample_count_per_chunk,
+            )
+        )
+        self._chunk: np.ndarray = np.empty(
+            self._sample_count_per_chunk, dtype=np.int16
+        )
+        self._seen_overrun_count: int = 0
+        self._gain_stage = self._create_gain_stage()
         buffersize_msec = int(
             1000 * self._sample_count_per_chunk / self._model_sample_rate
         )
-        self._capture_device = miniaudio.CaptureDevice(
-            input_format=self._sample_format,
-            nchannels=self._channel_count,
-            sample_rate=self._model_sample_rate,
-            buffersize_msec=buffersize_msec,
-            device_id=device_id,
-        )
-
-        self._model = WakeWordModel(models=self._wake_word_model_paths)
+        try:
+            self._capture_device = miniaudio.CaptureDevice(
+                input_format=self._sample_format,
+                nchannels=self._channel_count,
+                sample_rate=self._model_sample_rate,
+                buffersize_msec=buffersize_msec,
+                device_id=device_id,
+            )
+        except miniaudio.MiniaudioError as e:
+            raise AudioDeviceError(f"Cannot open the audio device: {e}") from e
 
-        self._model_count: int = len(self._wake_word_model_paths)
-        self._audio_buffer: np.ndarray = np.array([], dtype=np.int16)
         self._audio_buffer_size: int = 2 * self._model_sample_rate  # 2s sliding window
+        self._audio_buffer = SlidingWindow(self._audio_buffer_size)
+        # Samples written to the window so far, and the stream they belong
+        # to. A gap in the audio starts a new epoch.
+        self._stream_position: int = 0
+        self._epoch: int = 0
+        # Set by the inference worker after a detection
+        self._restart_requested = threading.Event()
+
+        self._vad_gate = VoiceActivityGate(
+            threshold_db=self._config.vad_threshold_db,
+            min_dbfs=self._config.vad_min_dbfs,
+            hangover_chunks=int(
+                self._config.vad_hangover
+                * self._model_sample_rate
+                / self._sample_count_per_chunk
+            ),
+        )
+        self._skipped_chunk_count: int = 0
+        inference_seconds = detection_latency_seconds = None
+        if metrics is not None:
+            inference_seconds = metrics.histogram(
+                "wake_word_inference_seconds",
+                "Feature update and scoring time of one audio window",
+            )
+            detection_latency_seconds = metrics.histogram(
+                "wake_word_detection_latency_seconds",
+                "Time from an audio chunk arriving to its scores",
+            )
+        # The model only runs on the worker, a slow inference never keeps
+        # this thread from draining the capture ring
+        self._inference_worker = InferenceWorker(
+            self._model,
+            self._model_names,
+            self._audio_buffer_size,
+            on_scores=self._handle_scores,
+            deadline=self._config.inference_deadline,
+            inference_seconds=inference_seconds,
+            detection_latency_seconds=detection_latency_seconds,
+        )
+        self._detected_in_previous_scores: bool = False
 
         self._wake_word_callback: bool = None
-        self._last_detection_time: float = 0.0
         self._chunk_counter: int = 0
         self._stop_event = threading.Event()
         self._pause_event = threading.Event()
@@ -110,14 +300,39 @@ class WakeWordDetector:
         print(f"Searching for audio device matching '{name}':")
 
         if len(matches) == 0:
-            raise ValueError(f"No audio device found matching '{name}'")
+            raise AudioDeviceError(f"No audio device found matching '{name}'")
         if len(matches) > 1:
             match_names = "\n  ".join(f"{i}: {n}" for i, n, _ in matches)
-            raise ValueError(f"Multiple audio devices match '{name}':\n  {match_names}")
+            raise AudioDeviceError(
+                f"Multiple audio devices match '{name}':\n  {match_names}"
+            )
 
         print(f"Selected audio device {matches[0][0]}: {matches[0][1]}")
         return matches[0][2]
 
+    def stats(self) -> dict[str, int]:
+        """Classifier runs, dropped windows, deadline misses, skipped and
+        clipped chunks and capture overruns."""
+        return {
+            **self._inference_worker.stats(),
+            "skipped_chunks": self._skipped_chunk_count,
+            "overruns": self._audio_ring.overrun_count,
+            "dropped_samples": self._audio_ring.dropped_sample_count,
+            "clipped_chunks": self._gain_stage.clipped_chunk_count,
+        }
+
+    def _reset_stream(self) -> None:
+        """Start a new stream, audio thread only."""
+        self._inference_worker.clear()
+        self._audio_buffer.clear()
+        self._vad_gate.reset()
+        self._epoch += 1
+
+    @property
+    def last_wake_word(self) -> str | None:
+        """Name of the model that triggered the last callback."""
+        return self._last_wake_word
+
     def register_wake_word_callback(self, callback):
         """Register a callback to be called when a wake word is detected."""
         self._wake_word_callback = callback
@@ -126,11 +341,11 @@ class WakeWordDetector:
         """Pause wake word detection (audio is still captured but not processed)."""
         print("Wake word detector paused.")
         self._pause_event.clear()
+        self._inference_worker.clear()
 
     def resume(self) -> None:
         """Resume wake word detection."""
         print("Wake word detector resumed.")
-        self._audio_queue.queue.clear()
         self._pause_event.set()
 
     def stop(self) -> None:
@@ -140,39 +355,21 @@ class WakeWordDetector:
         self._pause_event.set()  # unblock if paused so the loop can exit
         self._capture_device.close()
 
-    def _apply_audio_gain(self, audio: np.ndarray) -> np.ndarray:
-        """
-        Apply software gain to audio signal with clipping protection.
-
-        Args:
-            audio: Input audio as int16 numpy array
-
-        Returns:
-            Gain-adjusted audio as int16 numpy array
-        """
-        # Clamp gain to safety limit
-        gain = min(self._config.audio_gain, self._max_gain)
-
-        if gain == 1.0:
-            return audio
-
-        # Convert to float32 for processing to avoid overflow
-        audio_float = audio.astype(np.float32)
-
-        # Apply gain
-        audio_float *= gain
-
-        # Clip to prevent distortion (always enabled)
-        audio_float = np.clip(audio_float, -32768, 32767)
-
-        # Convert back to int16
-        return audio_float.astype(np.int16)
+    def _create_gain_stage(self) -> GainStage:
+        return GainStage(
+            gain=self._config.audio_gain,
+            max_gain=self._max_gain,
+            agc_enabled=self._config.agc_enabled,
+            agc_target_dbfs=self._config.agc_target_dbfs,
+            chunk_size=self._sample_count_per_chunk,
+        )
 
     def _audio_callback_generator(self):
         while True:
             data = yield
-            if data:
-                self._audio_queue.put(data)
+            # Audio captured while paused is never stored
+            if data and self._pause_event.is_set():
+                self._audio_ring.write(data)
 
     def listen_for_wake_word(self) -> None:
         print("#" * 100)
@@ -183,120 +380,135 @@ class WakeWordDetector:
 
         callback = self._audio_callback_generator()
         next(callback)
+        self._inference_worker.start()
         self._capture_device.start(callback)
 
-        wake_word_detected_in_previous_chunk = False
-
         while not self._stop_event.is_set():
-            # Get audio at native sample rate with timeout
-            try:
-                raw_data = self._audio_queue.get(timeout=0.5)
-            except queue.Empty:
-                continue
-
             if not self._pause_event.is_set():
                 self._pause_event.wait()
-                self._audio_queue.queue.clear()
+                # Drop what was captured right before the pause
+                self._audio_ring.discard()
+                self._reset_stream()
                 continue
 
-            audio = np.frombuffer(raw_data, dtype=np.int16)
+            if self._restart_requested.is_set():
+                # The worker detected a wake word, start listening afresh
+                self._restart_requested.clear()
+                self._reset_stream()
 
-            # Apply software gain if configured
-            if self._config.audio_gain != 1.0:
-                audio = self._apply_audio_gain(audio)
+            # Get audio at native sample rate with timeout
+            if not self._audio_ring.read(self._chunk, timeout=0.5):
+                continue
 
-            # Append to rolling buffer and trim to 2s
-            self._audio_buffer = np.concatenate([self._audio_buffer, audio])
-            if len(self._audio_buffer) > self._audio_buffer_size:
-                self._audio_buffer = self._audio_buffer[-self._audio_buffer_size :]
+            overrun_count = self._audio_ring.overrun_count
+            if overrun_count != self._seen_overrun_count:
+                print(
+                    f"Audio overrun, {overrun_count - self._seen_overrun_count} "
+                    "capture buffers dropped"
+                )
+                self._seen_overrun_count = overrun_count
+                # The stream has a gap, rebuild the features from the window
+                self._epoch += 1
+
+            # Apply software gain in place
+            audio = self._gain_stage.process(self._chunk)
+
+            self._audio_buffer.write(audio)
+            self._stream_position += len(audio)
+
+            if self._config.vad_enabled:
+                if not self._vad_gate.is_active(audio):
+                    # The worker catches up on the skipped chunks from the
+                    # window once there is speech again
+                    self._skipped_chunk_count += 1
+                    continue
+                stride = 1
+            else:
+                stride = self._config.inference_stride
 
             self._chunk_counter += 1
-            if self._chunk_counter % self._config.inference_stride != 0:
+            if self._chunk_counter % stride != 0:
                 continue
 
-            scores = self._model.predict(self._audio_buffer)
+            self._inference_worker.submit(
+                self._audio_buffer.view(), self._stream_position, self._epoch
+            )
 
-            wake_word_detected = False
-            for m, score in scores.items():
+        self._inference_worker.stop()
+        print("Wake word detector stopped")
 
-                if score > self._detection_threshold:
-                    # Add a newline if we didn't detect a wake word in the chunk before
-                    if not wake_word_detected_in_previous_chunk:
-                        print("")
+    def _handle_scores(self, scores: dict[str, float]) -> bool:
+        """Report a detection, called on the inference worker.
 
-                    wake_word_detected_in_previous_chunk = True
-                    wake_word_detected = True
-                    formatted_score: str = format(score, ".20f").replace("-", "")
-                    formatted_model: str = f"{m}{' ' * (16 - len(m))}"
+        Returns:
+            Whether a wake word triggered and the stream restarts.
+        """
+        detected_scores: dict[str, float] = {}
+        for m, score in scores.items():
 
-                    print(f"{formatted_model} | {formatted_score[0:5]}")
-                else:
-                    wake_word_detected_in_previous_chunk = False
+            if score > self._thresholds[m]:
+                # Add a newline if we didn't detect a wake word in the chunk before
+                if not self._detected_in_previous_scores:
+                    print("")
 
-                    if self._config.debug:
-                        print("-", end="", flush=True)
+                self._detected_in_previous_scores = True
+                detected_scores[m] = score
+                formatted_score: str = format(score, ".20f").replace("-", "")
+                formatted_model: str = f"{m}{' ' * (16 - len(m))}"
 
-            if wake_word_detected:
-                now = time.monotonic()
-                if now - self._last_detection_time >= self._config.debounce:
-                    self._last_detection_time = now
-                    self._audio_buffer = np.array([], dtype=np.int16)
-                    if self._wake_word_callback:
-                        self._wake_word_callback()
+                print(f"{formatted_model} | {formatted_score[0:5]}")
+            else:
+                self._detected_in_previous_scores = False
 
-        print("Wake word detector stopped")
+                if self._config.debug:
+                    print("-", end="", flush=True)
 
-    def listen_for_wake_word_in_file(self, file_path: str) -> None:
-        import wave
+        if not detected_scores:
+            return False
+        now = time.monotonic()
+        triggered = [
+            m
+            for m in detected_scores
+            if now - self._last_detection_times[m] >= self._debounces[m]
+        ]
+        if not triggered:
+            return False
+        for m in triggered:
+            self._last_detection_times[m] = now
+        self._last_wake_word = max(triggered, key=detected_scores.get)
+        self._restart_requested.set()
+        if self._wake_word_callback:
+            self._wake_word_callback()
+        return True
 
+    def listen_for_wake_word_in_file(self, file_path: str) -> None:
         print("#" * 100)
         print(f"Processing wake word detection from file: {file_path}")
         print("#" * 100)
 
-        with wave.open(file_path, "rb") as wf:
-            n_channels = wf.getnchannels()
-            orig_sample_rate = wf.getframerate()
-            n_frames = wf.getnframes()
-            raw_data = wf.readframes(n_frames)
-
-        # Convert to mono 16kHz int16 using miniaudio
-        converted = miniaudio.convert_frames(
-            from_fmt=miniaudio.SampleFormat.SIGNED16,
-            from_numchannels=n_channels,
-            from_samplerate=orig_sample_rate,
-            sourcedata=raw_data,
-            to_fmt=miniaudio.SampleFormat.SIGNED16,
-            to_numchannels=1,
-            to_samplerate=16000,
-        )
-        audio = np.frombuffer(converted, dtype=np.int16)
-
-        # Apply software gain if configured
-        if self._config.audio_gain != 1.0:
-            audio = self._apply_audio_gain(audio)
+        # Writable copy, the gain is applied to it chunk by chunk in place
+        audio = load_wav(file_path).copy()
+        gain_stage = self._create_gain_stage()
 
         chunk_size = 1280
         wake_word_detected_in_previous_chunk = False
         wake_word_detected = False
 
-        file_buffer: np.ndarray = np.array([], dtype=np.int16)
         file_chunk_counter = 0
+        self._model.reset()
 
         for i in range(0, len(audio) - chunk_size + 1, chunk_size):
-            chunk = audio[i : i + chunk_size]
-            file_buffer = np.concatenate([file_buffer, chunk])
-            if len(file_buffer) > self._audio_buffer_size:
-                file_buffer = file_buffer[-self._audio_buffer_size :]
+            self._model.update(gain_stage.process(audio[i : i + chunk_size]))
 
             file_chunk_counter += 1
             if file_chunk_counter % self._config.inference_stride != 0:
                 continue
 
-            scores = self._model.predict(file_buffer)
+            scores = self._model.scores(self._model_names)
 
             for m, score in scores.items():
 
-                if score > self._detection_threshold:
+                if score > self._thresholds[m]:
                     # Add a newline if we didn't detect a wake word in the chunk before
                     if not wake_word_detected_in_previous_chunk:
                         print("")
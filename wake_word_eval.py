@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import onnxruntime as ort
+
+from streaming_model import BLOCK_SIZE, StreamingWakeWordModel
+from wake_word_detector import load_wav
+
+SAMPLE_RATE = 16000
+THRESHOLDS = [round(0.05 * i, 2) for i in range(1, 20)]
+
+
+@dataclass
+class FileResult:
+    file: str
+    label: bool | None
+    duration: float  # Seconds of audio
+    frontend_time: float  # Seconds of CPU spent on shared features
+    head_times: dict[str, float] = field(default_factory=dict)
+    times: list[float] = field(default_factory=list)
+    scores: dict[str, list[float]] = field(default_factory=dict)
+
+
+@dataclass
+class ModelSummary:
+    model: str
+    real_time_factor: float
+    # threshold -> (false reject rate, false accepts per hour)
+    det: dict[float, tuple[float, float]] = field(default_factory=dict)
+
+
+def collect_samples(directory: Path) -> list[tuple[Path, bool | None]]:
+    """All WAV files in directory with their label from labels.json.
+
+    labels.json maps file names to true (contains the wake word) or false.
+    Files without a label are scored but left out of the DET summary.
+    """
+    labels: dict[str, bool] = {}
+    labels_path = directory / "labels.json"
+    if labels_path.exists():
+        with open(labels_path) as f:
+            labels = json.load(f)
+    return [(path, labels.get(path.name)) for path in sorted(directory.glob("*.wav"))]
+
+
+_worker_model: StreamingWakeWordModel | None = None
+
+
+def _init_worker(model_paths: list[str]) -> None:
+    global _worker_model
+    # One intra-op thread per process, the pool already uses every core
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1
+    options.inter_op_num_threads = 1
+    _worker_model = StreamingWakeWordModel(models=model_paths, sess_options=options)
+
+
+def _score_file(path: str, label: bool | None, stride: int) -> FileResult:
+    model = _worker_model
+    audio = load_wav(path)
+    result = FileResult(
+        file=path,
+        label=label,
+        duration=len(audio) / SAMPLE_RATE,
+        frontend_time=0.0,
+        head_times={name: 0.0 for name in model.model_names},
+        scores={name: [] for name in model.model_names},
+    )
+
+    model.reset()
+    for n, i in enumerate(range(0, len(audio) - BLOCK_SIZE + 1, BLOCK_SIZE), 1):
+        start = time.process_time()
+        model.update(audio[i : i + BLOCK_SIZE])
+        result.frontend_time += time.process_time() - start
+        if n % stride != 0:
+            continue
+
+        result.times.append((i + BLOCK_SIZE) / SAMPLE_RATE)
+        for name in model.model_names:
+            start = time.process_time()
+            score = model.scores([name])[name]
+            result.head_times[name] += time.process_time() - start
+            result.scores[name].append(score)
+    return result
+
+
+def count_detections(
+    times: list[float], scores: list[float], threshold: float, debounce: float
+) -> int:
+    """Number of detections a detector with this threshold would report."""
+    count = 0
+    last = float("-inf")
+    for t, score in zip(times, scores):
+        if score > threshold and t - last >= debounce:
+            count += 1
+            last = t
+    return count
+
+
+def summarize(
+    results: list[FileResult], debounce: float = 2.0
+) -> list[ModelSummary]:
+    audio_time = sum(r.duration for r in results) or 1.0
+    frontend_time = sum(r.frontend_time for r in results)
+    positives = [r for r in results if r.label is True]
+    negatives = [r for r in results if r.label is False]
+    negative_hours = sum(r.duration for r in negatives) / 3600
+
+    summaries = []
+    for name in results[0].scores if results else []:
+        head_time = sum(r.head_times[name] for r in results)
+        summary = ModelSummary(
+            model=name, real_time_factor=(frontend_time + head_time) / audio_time
+        )
+        for threshold in THRESHOLDS:
+            misses = sum(
+                1 for r in positives if max(r.scores[name], default=0.0) <= threshold
+            )
+            false_accepts = sum(
+                count_detections(r.times, r.scores[name], threshold, debounce)
+                for r in negatives
+            )
+            summary.det[threshold] = (
+                misses / len(positives) if positives else float("nan"),
+                false_accepts / negative_hours if negative_hours else float("nan"),
+            )
+        summaries.append(summary)
+    return summaries
+
+
+def evaluate(
+    directory: Path,
+    model_paths: list[str],
+    stride: int = 1,
+    workers: int | None = None,
+) -> list[FileResult]:
+    """Score every WAV in directory against all models, one file per core."""
+    samples = collect_samples(directory)
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(model_paths,),
+    ) as pool:
+        futures = [
+            pool.submit(_score_file, str(path), label, stride)
+            for path, label in samples
+        ]
+        return [future.result() for future in futures]
+
+
+def print_summary(summaries: list[ModelSummary]) -> None:
+    for summary in summaries:
+        print("#" * 100)
+        print(f"{summary.model} | real-time factor {summary.real_time_factor:.4f}")
+        print("threshold | false reject rate | false accepts/hour")
+        for threshold, (frr, fa_per_hour) in summary.det.items():
+            print(f"{threshold:9.2f} | {frr:17.3f} | {fa_per_hour:18.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluate wake word models")
+    parser.add_argument("directory", type=Path, help="Directory of WAV files")
+    parser.add_argument(
+        "--models",
+        type=Path,
+        default=Path("resources/models/custom"),
+        help="Directory of wake word ONNX models",
+    )
+    parser.add_argument("--stride", type=int, default=1, help="Inference stride")
+    parser.add_argument("--workers", type=int, default=None, help="Processes")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Write per-file score timelines as JSON lines",
+    )
+    args = parser.parse_args()
+
+    model_paths = [str(p) for p in sorted(args.models.glob("*.onnx"))]
+    print(f"Evaluating {len(model_paths)} model(s) on {args.directory}")
+
+    start = time.monotonic()
+    results = evaluate(args.directory, model_paths, args.stride, args.workers)
+    print(f"Scored {len(results)} file(s) in {time.monotonic() - start:.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            for result in results:
+                f.write(json.dumps(asdict(result)) + "\n")
+
+    print_summary(summarize(results))
+
+
+if __name__ == "__main__":
+    main()